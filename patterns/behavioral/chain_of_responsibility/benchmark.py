@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import itertools
+import json
+import time
+import tracemalloc
+from threading import Thread
+from typing import TYPE_CHECKING
+
+from .main import (
+    AuthenticationMiddleWare,
+    ChainInstrumentation,
+    CORSMiddleWare,
+    Middleware,
+    Request,
+    RequestHandler,
+    TokenBucketStore,
+    ValidationMiddleWare,
+    compile_chain,
+)
+from .streaming import StreamingBody, StreamingValidationMiddleWare
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+def build_chain(length: int) -> RequestHandler:
+    factories = (
+        lambda: CORSMiddleWare(['*']),
+        lambda: CORSMiddleWare(['localhost:8000', 'localhost:8080']),
+        ValidationMiddleWare,
+        AuthenticationMiddleWare,
+    )
+    handlers: list[Middleware] = [factories[i % len(factories)]() for i in range(length)]
+    for handler, next_handler in itertools.pairwise(handlers):
+        handler.set_next_handler(next_handler)
+    return handlers[0]
+
+
+def make_request() -> Request:
+    return Request(
+        method='POST',
+        url='localhost:3000/api/users',
+        body={'name': 'user'},
+        headers={
+            'origin': 'localhost:8000',
+            'Authorization': 'Bereer my-token',
+            'content-type': 'aplication/json',
+        },
+    )
+
+
+def bench(handler: RequestHandler, n: int) -> float:
+    request = make_request()
+    start = time.perf_counter()
+    for _ in range(n):
+        handler.handle(request)
+    return time.perf_counter() - start
+
+
+def bench_origins(n_tenants: int, n: int) -> tuple[float, float]:
+    allowed_origins = [f'https://tenant-{i}.example.com' for i in range(n_tenants)]
+    allowed_origins += ['https://*.preview.example.com', 'http://localhost:*']
+    origins = [f'https://tenant-{i * 7 % n_tenants}.example.com' for i in range(64)]
+    origins += [f'https://pr-{i}.preview.example.com' for i in range(64)]
+    cors = CORSMiddleWare(allowed_origins)
+
+    start = time.perf_counter()
+    for i in range(n):
+        origins[i % len(origins)] in allowed_origins  # noqa: B015
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n):
+        cors.is_origin_allowed(origins[i % len(origins)])
+    compiled = time.perf_counter() - start
+    return scan, compiled
+
+
+def bench_rate_limit(shards: int, n_threads: int, n: int) -> float:
+    store = TokenBucketStore(rate=1_000_000, capacity=1_000_000, shards=shards)
+    keys = [f'client-{i}' for i in range(1_000)]
+
+    def work() -> None:
+        for i in range(n // n_threads):
+            store.acquire(keys[i % len(keys)])
+
+    threads = [Thread(target=work) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def make_payload(size: int, malformed: bool) -> bytes:
+    item = b'{"id": 12345, "name": "user", "tags": ["a", "b"], "active": true},'
+    items = item * (size // len(item))
+    if malformed:
+        items = item * 16 + b'}' + items
+    return b'{"items": [' + items + b'{}]}'
+
+
+def chunks(data: bytes, size: int = 64 * 1024) -> Iterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def buffered(data: bytes) -> None:
+    json.loads(b''.join(chunks(data)))
+
+
+def streamed(data: bytes) -> None:
+    request = Request(
+        method='POST',
+        url='localhost:3000/api/users',
+        body=StreamingBody(chunks(data)),
+        headers={'content-type': 'application/json'},
+    )
+    StreamingValidationMiddleWare(max_body_size=len(data)).handle(request)
+    assert isinstance(request.body, StreamingBody)
+    for _ in request.body:
+        pass
+
+
+def bench_body(read: Callable[[bytes], None], data: bytes) -> tuple[float, int]:
+    def run() -> None:
+        try:
+            read(data)
+        except ValueError:
+            pass
+
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    n = 100_000
+    for length in (3, 10, 30):
+        chain = build_chain(length)
+        chained = bench(chain, n)
+        compiled = bench(compile_chain(chain), n)
+        print(
+            f'{length:>3} middlewares | chain: {n / chained:>12,.0f} req/s'
+            f' | compiled: {n / compiled:>12,.0f} req/s | x{chained / compiled:.1f}'
+        )
+
+    print('-' * 30)
+
+    for length in (3, 10):
+        chain = build_chain(length)
+        plain = bench(chain, n)
+        instrumentation = ChainInstrumentation()
+        instrumentation.attach(chain)
+        instrumented = bench(chain, n)
+        instrumentation.detach()
+        print(
+            f'{length:>3} middlewares | plain: {n / plain:>12,.0f} req/s'
+            f' | instrumented: {n / instrumented:>12,.0f} req/s'
+            f' | +{(instrumented - plain) / n / length * 1e9:.0f} ns per link'
+        )
+
+    print('-' * 30)
+
+    for n_tenants in (10, 1_000, 10_000):
+        scan, compiled = bench_origins(n_tenants, n)
+        print(
+            f'{n_tenants:>6} origins | list scan: {n / scan:>12,.0f} checks/s'
+            f' | compiled: {n / compiled:>12,.0f} checks/s'
+        )
+
+    print('-' * 30)
+
+    for shards in (1, 16):
+        for n_threads in (1, 8):
+            elapsed = bench_rate_limit(shards, n_threads, n * 4)
+            print(f'{shards:>3} shards, {n_threads} threads | rate limit: {n * 4 / elapsed:>12,.0f} acquires/s')
+
+    print('-' * 30)
+
+    for malformed in (False, True):
+        data = make_payload(8 << 20, malformed)
+        label = 'malformed' if malformed else 'valid'
+        for name, read in (('buffered', buffered), ('streamed', streamed)):
+            elapsed, peak = bench_body(read, data)
+            print(
+                f'{len(data) >> 20} MiB {label:>9} body | {name}: {elapsed * 1e3:>8.1f} ms'
+                f' | peak {peak / (1 << 20):>6.1f} MiB'
+            )
+
+
+if __name__ == '__main__':
+    main()
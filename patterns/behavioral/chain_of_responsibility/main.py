@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+import dataclasses
+import itertools
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Self
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from threading import Lock, get_ident
+from typing import TYPE_CHECKING, Any, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterator
+
+    from .streaming import StreamingBody
 
 
 class Request:
@@ -9,7 +21,7 @@ class Request:
         self,
         method: str,
         url: str,
-        body: str | dict[str, Any] | None = None,
+        body: str | dict[str, Any] | StreamingBody | None = None,
         headers: dict[str, Any] | None = None,
     ) -> None:
         self.method = method
@@ -35,36 +47,69 @@ class RequestHandler(ABC):
 
 
 class Middleware(RequestHandler):
+    def check(self, r: Request) -> None: ...
+
+    def is_noop(self) -> bool:
+        return type(self).check is Middleware.check
+
     def handle(self, r: Request) -> Request:
+        self.check(r)
         if self.next_handler:
             self.next_handler.handle(r)
         return r
 
 
 class CORSMiddleWare(Middleware):
-    def __init__(self, allowed_origins: list[str]) -> None:
+    def __init__(self, allowed_origins: list[str], max_cached_origins: int = 4096) -> None:
         super().__init__()
         self.allowed_origins = allowed_origins
-
-    def handle(self, r: Request) -> Request:
+        self.allow_all = '*' in allowed_origins
+
+        # exact origins go in a set, wildcard ones like 'https://*.example.com' into one regex
+        self.exact_origins = frozenset(origin for origin in allowed_origins if '*' not in origin)
+        wildcard_origins = [origin for origin in allowed_origins if '*' in origin and origin != '*']
+        self.wildcard_pattern = (
+            re.compile('|'.join(re.escape(origin).replace(r'\*', r'[^./:]+') for origin in wildcard_origins))
+            if wildcard_origins
+            else None
+        )
+        self.max_cached_origins = max_cached_origins
+        self._decisions: dict[str, bool] = {}
+
+    def is_noop(self) -> bool:
+        return self.allow_all
+
+    def is_origin_allowed(self, origin: str) -> bool:
+        if origin in self.exact_origins:
+            return True
+        if self.wildcard_pattern is None:
+            return False
+
+        allowed = self._decisions.get(origin)
+        if allowed is None:
+            allowed = self.wildcard_pattern.fullmatch(origin) is not None
+            if len(self._decisions) >= self.max_cached_origins:
+                self._decisions.clear()
+            self._decisions[origin] = allowed
+        return allowed
+
+    def check(self, r: Request) -> None:
         # print('cors middleware')
 
-        if self.allowed_origins == ['*']:
-            return super().handle(r)
+        if self.allow_all:
+            return
 
         if not r.headers:
             raise ValueError('CORS Error missing headers')
 
         origin = r.headers.get('origin')
 
-        if origin not in self.allowed_origins:
+        if not isinstance(origin, str) or not self.is_origin_allowed(origin):
             raise ValueError('CORS Error origin not allowed')
 
-        return super().handle(r)
-
 
 class ValidationMiddleWare(Middleware):
-    def handle(self, r: Request) -> Request:
+    def check(self, r: Request) -> None:
         # print('validate middleware')
 
         if r.method == 'POST' and r.headers:
@@ -72,11 +117,93 @@ class ValidationMiddleWare(Middleware):
             if content_type == 'aplication/json' and not isinstance(r.body, dict):
                 raise ValueError('Invalid Body')
 
-        return super().handle(r)
+
+class TokenValidator(ABC):
+    @abstractmethod
+    def validate(self, token: str) -> bool: ...
+
+
+class PresenceValidator(TokenValidator):
+    def validate(self, token: str) -> bool:
+        return bool(token)
+
+
+class CachedTokenValidator(TokenValidator):
+    def __init__(
+        self,
+        validator: TokenValidator,
+        maxsize: int = 10_000,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+    ) -> None:
+        self.validator = validator
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[str, tuple[float, bool]] = OrderedDict()
+        self._inflight: dict[str, Future[bool]] = {}
+        self._lock = Lock()
+
+    def validate(self, token: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                expires_at, valid = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return valid
+                del self._entries[token]
+
+            # single flight: concurrent requests with the same new token wait for one validation
+            future = self._inflight.get(token)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                self._inflight[token] = Future()
+
+        if future is not None:
+            return future.result()
+        return self._validate(token)
+
+    def _validate(self, token: str) -> bool:
+        future = self._inflight[token]
+        try:
+            valid = self.validator.validate(token)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[token]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            ttl = self.ttl if valid else self.negative_ttl
+            self._entries[token] = (time.monotonic() + ttl, valid)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            del self._inflight[token]
+        future.set_result(valid)
+        return valid
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'size': len(self._entries),
+        }
 
 
 class AuthenticationMiddleWare(Middleware):
-    def handle(self, r: Request) -> Request:
+    def __init__(self, validator: TokenValidator | None = None) -> None:
+        super().__init__()
+        self.validator = validator or PresenceValidator()
+
+    def check(self, r: Request) -> None:
         # print('auth middleware')
 
         if not r.headers:
@@ -86,11 +213,251 @@ class AuthenticationMiddleWare(Middleware):
         if not token:
             raise ValueError('Unauthorize')
 
-        token_is_valid = bool(token)
+        token_is_valid = self.validator.validate(token)
         if not token_is_valid:
             raise ValueError('Invalid Token')
 
-        return super().handle(r)
+
+class TokenBucketStore:
+    # Keys are spread over shards, each with its own lock and LRU of (tokens, updated_at) buckets.
+    # A bucket idle long enough to refill completely is dropped, since a missing key means a full
+    # bucket; the oldest bucket of a shard is checked for that on every acquire.
+    def __init__(self, rate: float, capacity: float, shards: int = 16, max_keys: int = 100_000) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.refill_time = capacity / rate
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self._shards: list[OrderedDict[str, tuple[float, float]]] = [OrderedDict() for _ in range(shards)]
+        self._locks = [Lock() for _ in range(shards)]
+
+    def acquire(self, key: str, cost: float = 1.0) -> bool:
+        shard_id = hash(key) % len(self._shards)
+        buckets = self._shards[shard_id]
+        with self._locks[shard_id]:
+            # read under the lock so updated_at never goes backwards when threads race on a key
+            now = time.monotonic()
+            bucket = buckets.pop(key, None)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens, updated_at = bucket
+                tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            buckets[key] = (tokens, now)
+
+            # evicting up to two per call lets a shard shrink once its keys go idle
+            for _ in range(2):
+                oldest_key, (_, oldest_updated_at) = next(iter(buckets.items()))
+                if oldest_key == key:
+                    break
+                if now - oldest_updated_at < self.refill_time and len(buckets) <= self.max_keys_per_shard:
+                    break
+                del buckets[oldest_key]
+        return allowed
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self._shards)
+
+
+class RateLimitMiddleware(Middleware):
+    def __init__(self, store: TokenBucketStore, key_header: str | None = None) -> None:
+        super().__init__()
+        self.store = store
+        self.key_header = key_header
+
+    def check(self, r: Request) -> None:
+        headers = r.headers or {}
+        key = headers.get(self.key_header) if self.key_header else headers.get('origin')
+        if not self.store.acquire(str(key or 'anonymous')):
+            raise ValueError('Rate limit exceeded')
+
+
+class CompiledChain(RequestHandler):
+    def __init__(self, middlewares: list[Middleware], tail: RequestHandler | None = None) -> None:
+        super().__init__()
+        self.middlewares = middlewares
+        self.tail = tail
+
+    def handle(self, r: Request) -> Request:
+        # check is looked up per call, so instrumentation attached after compiling still applies
+        for middleware in self.middlewares:
+            middleware.check(r)
+        if self.tail:
+            self.tail.handle(r)
+        return r
+
+
+# Flattens a chain into a list of middlewares whose checks run in a loop. Middlewares that cannot
+# reject anything are dropped; a handler that is not a Middleware (or overrides handle) ends the
+# flat part and runs the rest of the chain itself.
+def compile_chain(handler: RequestHandler) -> CompiledChain:
+    middlewares: list[Middleware] = []
+    current: RequestHandler | None = handler
+    while current is not None:
+        if not isinstance(current, Middleware) or type(current).handle is not Middleware.handle:
+            return CompiledChain(middlewares, tail=current)
+        if not current.is_noop():
+            middlewares.append(current)
+        current = current.next_handler
+    return CompiledChain(middlewares)
+
+
+@dataclasses.dataclass(slots=True)
+class StatsShard:
+    samples: deque[int]
+    calls: int = 0
+    timed: int = 0
+    timed_ns: int = 0
+    rejections: Counter[str] = dataclasses.field(default_factory=Counter)
+
+    def add_sample(self, elapsed: int) -> None:
+        self.timed += 1
+        self.timed_ns += elapsed
+        self.samples.append(elapsed)
+
+
+def percentile(ordered: list[int], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e9
+
+
+class HandlerStats:
+    # Counts every call and rejection, and times the first of every sample_every calls. Each thread
+    # records into its own shard, so recording takes no lock; a thread id reused once its thread has
+    # exited picks up the old shard, which is safe as the two threads never run at once.
+    max_reasons = 32
+
+    def __init__(self, name: str, sample_size: int = 1024, sample_every: int = 16) -> None:
+        self.name = name
+        self.sample_size = sample_size
+        self.sample_every = sample_every
+        self.shards: dict[int, StatsShard] = {}
+
+    def shard(self) -> StatsShard:
+        return self.shards.setdefault(get_ident(), StatsShard(deque(maxlen=self.sample_size)))
+
+    def reject(self, shard: StatsShard, error: Exception) -> None:
+        # messages put per-request detail after a colon ('Invalid Body: unexpected ...'), so the part
+        # before it is a fixed reason; past max_reasons, new reasons are counted as 'other'
+        reason = str(error).partition(':')[0] if isinstance(error, ValueError) else type(error).__name__
+        if reason not in shard.rejections and len(shard.rejections) >= self.max_reasons:
+            reason = 'other'
+        shard.rejections[reason] += 1
+
+    def report(self) -> dict[str, Any]:
+        # copies of each shard's deque and counter are taken whole, as their threads may be writing
+        shards = list(self.shards.values())
+        calls = sum(shard.calls for shard in shards)
+        timed = sum(shard.timed for shard in shards)
+        timed_ns = sum(shard.timed_ns for shard in shards)
+        ordered = sorted(itertools.chain.from_iterable(shard.samples.copy() for shard in shards))
+        rejections: Counter[str] = Counter()
+        for shard in shards:
+            rejections.update(dict(shard.rejections))
+        return {
+            'name': self.name,
+            'calls': calls,
+            # estimated from the timed calls
+            'total': timed_ns / timed * calls / 1e9 if timed else 0.0,
+            'p50': percentile(ordered, 0.5),
+            'p99': percentile(ordered, 0.99),
+            'rejections': dict(rejections),
+        }
+
+
+# Times each middleware's own check (not the rest of the chain) by shadowing its check with a
+# timed one, so it works for linked, compiled and async chains alike, whenever they were compiled.
+# Latency samples are a sliding window of recent timed calls per thread.
+class ChainInstrumentation:
+    def __init__(self, sample_size: int = 1024, sample_every: int = 16) -> None:
+        self.sample_size = sample_size
+        self.sample_every = sample_every
+        self.stats: list[HandlerStats] = []
+        self._handlers: list[Middleware] = []
+
+    def attach(self, handler: RequestHandler) -> None:
+        for middleware in self._middlewares(handler):
+            stats = HandlerStats(f'{len(self.stats)}:{type(middleware).__name__}', self.sample_size, self.sample_every)
+            middleware.check = self._timed(middleware.check, stats)  # type: ignore[assignment]
+            check_async = getattr(middleware, 'check_async', None)
+            if check_async is not None:
+                middleware.check_async = self._timed_async(check_async, stats)  # type: ignore[attr-defined]
+            self.stats.append(stats)
+            self._handlers.append(middleware)
+
+    def _middlewares(self, handler: RequestHandler) -> Iterator[Middleware]:
+        current: RequestHandler | None = handler
+        while current is not None:
+            if isinstance(current, CompiledChain):
+                yield from current.middlewares
+                current = current.tail
+                continue
+            if isinstance(current, Middleware):
+                yield current
+            current = current.next_handler
+
+    def detach(self) -> None:
+        for handler in self._handlers:
+            del handler.check
+            if 'check_async' in vars(handler):
+                del handler.check_async  # type: ignore[attr-defined]
+        self._handlers.clear()
+
+    def _timed(self, check: Callable[[Request], None], stats: HandlerStats) -> Callable[[Request], None]:
+        perf_counter_ns = time.perf_counter_ns
+        shards = stats.shards
+        every = stats.sample_every
+
+        def timed_check(r: Request) -> None:
+            shard = shards.get(get_ident()) or stats.shard()
+            calls = shard.calls
+            shard.calls = calls + 1
+            start = 0 if calls % every else perf_counter_ns()
+            try:
+                check(r)
+            except Exception as e:
+                stats.reject(shard, e)
+                raise
+            finally:
+                if start:
+                    shard.add_sample(perf_counter_ns() - start)
+
+        return timed_check
+
+    def _timed_async(
+        self, check_async: Callable[[Request], Awaitable[None]], stats: HandlerStats
+    ) -> Callable[[Request], Awaitable[None]]:
+        async def timed_check_async(r: Request) -> None:
+            shard = stats.shard()
+            calls = shard.calls
+            shard.calls = calls + 1
+            start = 0 if calls % stats.sample_every else time.perf_counter_ns()
+            try:
+                await check_async(r)
+            except Exception as e:
+                stats.reject(shard, e)
+                raise
+            finally:
+                if start:
+                    shard.add_sample(time.perf_counter_ns() - start)
+
+        return timed_check_async
+
+    def report(self) -> list[dict[str, Any]]:
+        return [stats.report() for stats in self.stats]
+
+    def format_report(self) -> str:
+        lines = [f'{"handler":<32} {"calls":>8} {"total ms":>10} {"p50 us":>8} {"p99 us":>8}  rejections']
+        for row in self.report():
+            lines.append(
+                f'{row["name"]:<32} {row["calls"]:>8} {row["total"] * 1e3:>10.3f}'
+                f' {row["p50"] * 1e6:>8.2f} {row["p99"] * 1e6:>8.2f}  {row["rejections"]}'
+            )
+        return '\n'.join(lines)
 
 
 def client(middleware_handler: RequestHandler) -> None:
@@ -130,15 +497,32 @@ def client2(middleware_handler: RequestHandler) -> None:
 
 def main() -> None:
     cors = CORSMiddleWare(['*'])
+    rate_limit = RateLimitMiddleware(TokenBucketStore(rate=10, capacity=2), key_header='Authorization')
     validate = ValidationMiddleWare()
-    auth = AuthenticationMiddleWare()
+    token_validator = CachedTokenValidator(PresenceValidator())
+    auth = AuthenticationMiddleWare(token_validator)
 
-    cors.set_next_handler(validate)
+    cors.set_next_handler(rate_limit)
+    rate_limit.set_next_handler(validate)
     validate.set_next_handler(auth)
 
     client(cors)
 
     # client2(cors)
 
+    client(compile_chain(cors))
+
+    print(f'token cache: {token_validator.stats()}')
+
+    instrumentation = ChainInstrumentation()
+    instrumentation.attach(cors)
+    try:
+        client(cors)
+    except ValueError as e:
+        print(f'rejected_request: {e}')
+    print(instrumentation.format_report())
+    instrumentation.detach()
+
 
-main()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import time
+from abc import abstractmethod
+from typing import TYPE_CHECKING
+
+from .main import AuthenticationMiddleWare, CORSMiddleWare, Middleware, Request, ValidationMiddleWare
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from .main import RequestHandler
+
+
+class AsyncMiddleware(Middleware):
+    @abstractmethod
+    async def check_async(self, r: Request) -> None: ...
+
+    def check(self, r: Request) -> None:
+        raise TypeError(f'{type(self).__name__} must run through handle_async')
+
+
+class TokenIntrospectionMiddleware(AsyncMiddleware):
+    def __init__(self, introspect: Callable[[str], Awaitable[bool]]) -> None:
+        super().__init__()
+        self.introspect = introspect
+
+    async def check_async(self, r: Request) -> None:
+        token = r.headers.get('Authorization') if r.headers else None
+        if not token or not await self.introspect(token):
+            raise ValueError('Invalid Token')
+
+
+# Runs a chain that mixes sync and async middlewares. Sync checks run inline and async checks
+# are awaited; a handler that overrides handle runs the rest of the chain synchronously.
+async def handle_async(handler: RequestHandler, r: Request) -> Request:
+    current: RequestHandler | None = handler
+    while current is not None:
+        if isinstance(current, AsyncMiddleware):
+            await current.check_async(r)
+        elif isinstance(current, Middleware) and type(current).handle is Middleware.handle:
+            current.check(r)
+        else:
+            current.handle(r)
+            break
+        current = current.next_handler
+    return r
+
+
+async def run_load(handler: RequestHandler, requests: list[Request], concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def process(r: Request) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await handle_async(handler, r)
+            except ValueError:
+                pass
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(process(r) for r in requests))
+    return latencies
+
+
+async def fake_introspect(token: str) -> bool:
+    # stands in for a call to an identity provider
+    await asyncio.sleep(random.uniform(0.001, 0.01))
+    return token.startswith('Bereer ')
+
+
+async def main() -> None:
+    cors = CORSMiddleWare(['localhost:8000'])
+    validate = ValidationMiddleWare()
+    introspect = TokenIntrospectionMiddleware(fake_introspect)
+    auth = AuthenticationMiddleWare()
+
+    cors.set_next_handler(validate)
+    validate.set_next_handler(introspect)
+    introspect.set_next_handler(auth)
+
+    requests = [
+        Request(
+            method='GET',
+            url=f'localhost:3000/api/users/{i}',
+            headers={
+                'origin': 'localhost:8000',
+                'Authorization': 'Bereer my-token' if i % 10 else 'Basic bad-token',
+            },
+        )
+        for i in range(5_000)
+    ]
+
+    for concurrency in (1, 100, 1_000):
+        start = time.perf_counter()
+        latencies = await run_load(cors, requests if concurrency > 1 else requests[:200], concurrency)
+        elapsed = time.perf_counter() - start
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f'concurrency {concurrency:>5} | {len(latencies) / elapsed:>8,.0f} req/s'
+            f' | p50 {quantiles[49] * 1000:6.2f}ms | p99 {quantiles[98] * 1000:6.2f}ms'
+            f' | max {max(latencies) * 1000:6.2f}ms'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import codecs
+import functools
+import re
+from typing import TYPE_CHECKING
+
+from .main import Request, ValidationMiddleWare
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+JSON_CONTENT_TYPES = frozenset({'application/json', 'aplication/json'})
+
+# Numbers and literals are matched loosely so one cut off at the end of a chunk can be told apart
+# from a bad one, then checked strictly once complete. Strings are scanned by JSONStreamValidator.
+TOKEN = re.compile(r'[ \t\r\n]*(?:(")|([-0-9][-+.0-9eE]*)|([a-z]+)|([{}\[\],:]))')
+SCALAR_PARTS = {2: re.compile(r'[-+.0-9eE]*'), 3: re.compile(r'[a-z]*')}
+# possessive, so a long string costs the regex engine no memory per character
+_STRING_BODY = r'(?:[^"\\\x00-\x1f]++|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*+'
+STRING_PART = re.compile(_STRING_BODY)
+STRING = re.compile(rf'"({_STRING_BODY})"')
+STRING_ESCAPE = re.compile(r'\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})')
+PARTIAL_ESCAPE = re.compile(r'(?:\\(?:u[0-9a-fA-F]{0,3})?)?')
+NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+LITERALS = frozenset({'true', 'false', 'null'})
+LITERAL_SIZE = max(map(len, LITERALS))
+CLOSERS = {'}': '{', ']': '['}
+FAST_DEPTH = 2
+# members per fast match; the regex engine keeps state for every repetition, so an unbounded run
+# would cost memory in proportion to the chunk
+FAST_RUN = 64
+_WS = r'[ \t\r\n]*'
+
+
+# Runs of members (`"key": value, ...` or `value, ...`) whose values nest at most two levels deep
+# are the bulk of most payloads, so each run is checked with one strict regex instead of token by
+# token. Numbers in these patterns are capped at the token size limit, strings are checked after a
+# run longer than it.
+@functools.cache
+def fast_paths(max_token_size: int) -> dict[tuple[str, str], re.Pattern[str]]:
+    string = rf'"{_STRING_BODY}"'
+    number = rf'(?=[-+.0-9eE]{{1,{max_token_size}}}+(?![-+.0-9eE])){NUMBER.pattern}'
+    scalar = rf'(?:{string}|{number}|true|false|null)'
+
+    def nested(value: str) -> str:
+        array = rf'\[{_WS}(?:{value}(?:{_WS},{_WS}{value}){{0,{FAST_RUN}}}{_WS})?\]'
+        member = rf'{string}{_WS}:{_WS}{value}'
+        obj = rf'\{{{_WS}(?:{member}(?:{_WS},{_WS}{member}){{0,{FAST_RUN}}}{_WS})?\}}'
+        return rf'(?:{scalar}|{array}|{obj})'
+
+    value = nested(nested(scalar))
+    member = rf'{_WS}{string}{_WS}:{_WS}{value}'
+    members = rf'(?:{_WS},{member})'
+    items = rf'(?:{_WS},{_WS}{value})'
+    return {
+        ('object_start', '{'): re.compile(rf'{member}{members}{{0,{FAST_RUN}}}'),
+        ('key', '{'): re.compile(rf'{member}{members}{{0,{FAST_RUN}}}'),
+        ('value', '{'): re.compile(rf'{_WS}{value}{members}{{0,{FAST_RUN}}}'),
+        ('after_value', '{'): re.compile(rf'{members}{{1,{FAST_RUN}}}'),
+        ('array_start', '['): re.compile(rf'{_WS}{value}{items}{{0,{FAST_RUN}}}'),
+        ('value', '['): re.compile(rf'{_WS}{value}{items}{{0,{FAST_RUN}}}'),
+        ('after_value', '['): re.compile(rf'{items}{{1,{FAST_RUN}}}'),
+    }
+
+
+def decoded_length(body: str) -> int:
+    if '\\' not in body:
+        return len(body)
+    unescaped, escapes = STRING_ESCAPE.subn('', body)
+    return len(unescaped) + escapes
+
+
+# compiling these takes tens of milliseconds, so the default limit is paid for at import rather than on the first request
+MAX_TOKEN_SIZE = 64 * 1024
+fast_paths(MAX_TOKEN_SIZE)
+
+
+class StreamingBody:
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.chunks = chunks
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.chunks)
+
+
+class JSONStreamValidator:
+    # Pushdown checker for JSON syntax fed one chunk at a time. It keeps the container stack and the
+    # state of the token cut off at the end of the last chunk, never the document itself; each
+    # chunk is scanned once, however long that token runs. max_token_size caps the decoded length
+    # of every string and the length of every number.
+    def __init__(self, max_depth: int = 64, max_token_size: int = MAX_TOKEN_SIZE, require_object: bool = True) -> None:
+        self.max_depth = max_depth
+        self.max_token_size = max_token_size
+        self.require_object = require_object
+        self.fast_paths = fast_paths(max_token_size)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.stack: list[str] = []
+        self.state = 'value'
+        # the open token: its kind (0 for none, else a TOKEN group), its length so far, the text of an
+        # open number or literal and the start of an escape cut off inside an open string
+        self.open_kind = 0
+        self.open_length = 0
+        self.open_parts: list[str] = []
+        self.escape = ''
+
+    def feed(self, chunk: bytes) -> None:
+        try:
+            text = self.decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise ValueError('Invalid Body encoding') from e
+        self._scan(text, final=False)
+
+    def close(self) -> None:
+        try:
+            text = self.decoder.decode(b'', final=True)
+        except UnicodeDecodeError as e:
+            raise ValueError('Invalid Body encoding') from e
+        self._scan(text, final=True)
+        if self.state != 'done':
+            raise ValueError('Invalid Body: unexpected end of JSON')
+
+    def _scan(self, text: str, final: bool) -> None:
+        pos = self._resume(text, final) if self.open_kind else 0
+        end = len(text)
+        # a scalar at the end of the chunk may continue in the next one, so fast runs stop at the last separator
+        cut = end if final else text.rfind(',')
+        while pos < end:
+            fast = self.fast_paths.get((self.state, self.stack[-1])) if self.stack else None
+            if fast is not None and cut > pos and len(self.stack) + FAST_DEPTH <= self.max_depth:
+                match = fast.match(text, pos, cut)
+                if match is not None:
+                    if match.end() - pos > self.max_token_size:
+                        self._check_strings(text, pos, match.end())
+                    self.state = 'after_value'
+                    pos = match.end()
+                    continue
+
+            match = TOKEN.match(text, pos)
+            if match is None:
+                rest = text[pos:].lstrip(' \t\r\n')
+                if rest:
+                    raise ValueError(f'Invalid Body: unexpected {rest[0]!r}')
+                return
+            if self.state == 'done':
+                raise ValueError('Invalid Body: data after JSON document')
+
+            kind = match.lastindex
+            assert kind is not None
+            pos = match.end()
+            if kind == 1:
+                self.open_kind = 1
+                pos = self._string(text, pos, final)
+            elif kind == 4:
+                self._punctuation(match.group(kind))
+            elif pos == end and not final:
+                # a number or literal that may continue in the next chunk
+                self.open_kind = kind
+                self._extend(match.group(kind))
+            else:
+                self._scalar(match.group(kind), kind)
+
+    def _resume(self, text: str, final: bool) -> int:
+        if self.open_kind == 1:
+            return self._string(text, 0, final)
+
+        match = SCALAR_PARTS[self.open_kind].match(text)
+        assert match is not None
+        self._extend(match.group())
+        if match.end() == len(text) and not final:
+            return match.end()
+        token, kind = ''.join(self.open_parts), self.open_kind
+        self.open_kind, self.open_length, self.open_parts = 0, 0, []
+        self._scalar(token, kind)
+        return match.end()
+
+    def _extend(self, part: str) -> None:
+        self.open_parts.append(part)
+        self.open_length += len(part)
+        if self.open_kind == 3 and self.open_length > LITERAL_SIZE:
+            raise ValueError(f'Invalid Body: bad literal {self.open_parts[0][:32]!r}')
+        if self.open_kind == 2 and self.open_length > self.max_token_size:
+            raise ValueError('Invalid Body: token too large')
+
+    def _string(self, text: str, pos: int, final: bool) -> int:
+        # Reads string content from pos up to the closing quote or the end of the chunk. Escapes count
+        # as the one character they decode to.
+        if self.escape:
+            head = self.escape + text[pos : pos + 5]
+            match = STRING_ESCAPE.match(head)
+            if match is None:
+                return self._string_end(head, len(text), final)
+            pos += match.end() - len(self.escape)
+            self.escape = ''
+            self.open_length += 1
+
+        match = STRING_PART.match(text, pos)
+        assert match is not None
+        self.open_length += decoded_length(match.group())
+        if self.open_length > self.max_token_size:
+            raise ValueError('Invalid Body: token too large')
+
+        pos = match.end()
+        if text[pos : pos + 1] != '"':
+            return self._string_end(text[pos:], len(text), final)
+        self.open_kind, self.open_length = 0, 0
+        self._value(1, 'string')
+        return pos + 1
+
+    def _string_end(self, rest: str, end: int, final: bool) -> int:
+        # the chunk ended inside the string, possibly partway through an escape
+        if PARTIAL_ESCAPE.fullmatch(rest) is None:
+            raise ValueError('Invalid Body: bad string')
+        if final:
+            raise ValueError('Invalid Body: unexpected end of JSON')
+        self.escape = rest
+        return end
+
+    def _check_strings(self, text: str, start: int, end: int) -> None:
+        # only a run longer than the limit can hold a string over it, escapes only make it shorter
+        for match in STRING.finditer(text, start, end):
+            body = match.group(1)
+            if len(body) > self.max_token_size and decoded_length(body) > self.max_token_size:
+                raise ValueError('Invalid Body: token too large')
+
+    def _punctuation(self, token: str) -> None:
+        state = self.state
+        if token in '{[' and state in {'value', 'array_start'}:
+            if state == 'value' and not self.stack and self.require_object and token != '{':
+                raise ValueError('Invalid Body: expected a JSON object')
+            self.stack.append(token)
+            if len(self.stack) > self.max_depth:
+                raise ValueError('Invalid Body: JSON nested too deeply')
+            self.state = 'object_start' if token == '{' else 'array_start'
+        elif token in CLOSERS and state in {'object_start', 'array_start', 'after_value'}:
+            if self.stack[-1:] != [CLOSERS[token]]:
+                raise ValueError(f'Invalid Body: unexpected {token!r}')
+            self.stack.pop()
+            self.state = 'after_value' if self.stack else 'done'
+        elif token == ',' and state == 'after_value' and self.stack:
+            self.state = 'key' if self.stack[-1] == '{' else 'value'
+        elif token == ':' and state == 'colon':
+            self.state = 'value'
+        else:
+            raise ValueError(f'Invalid Body: unexpected {token!r}')
+
+    def _scalar(self, token: str, kind: int) -> None:
+        if kind == 2:
+            if NUMBER.fullmatch(token) is None:
+                raise ValueError(f'Invalid Body: bad number {token[:32]!r}')
+            if len(token) > self.max_token_size:
+                raise ValueError('Invalid Body: token too large')
+        elif token not in LITERALS:
+            raise ValueError(f'Invalid Body: bad literal {token[:32]!r}')
+        self._value(kind, token[:32])
+
+    def _value(self, kind: int, label: str) -> None:
+        state = self.state
+        if kind == 1 and state in {'object_start', 'key'}:
+            self.state = 'colon'
+        elif state in {'value', 'array_start'}:
+            if not self.stack and self.require_object:
+                raise ValueError('Invalid Body: expected a JSON object')
+            self.state = 'after_value' if self.stack else 'done'
+        else:
+            raise ValueError(f'Invalid Body: unexpected {label}')
+
+
+class StreamingValidationMiddleWare(ValidationMiddleWare):
+    # Rejects a declared content-length over the limit straight away. Streaming bodies are wrapped
+    # so the size limit and JSON syntax are enforced chunk by chunk as the handler reads them.
+    def __init__(self, max_body_size: int = 1 << 20, max_depth: int = 64, max_token_size: int = MAX_TOKEN_SIZE) -> None:
+        super().__init__()
+        self.max_body_size = max_body_size
+        self.max_depth = max_depth
+        self.max_token_size = max_token_size
+
+    def check(self, r: Request) -> None:
+        headers = r.headers or {}
+        content_length = headers.get('content-length')
+        if content_length is not None:
+            if not str(content_length).isdigit():
+                raise ValueError('Invalid content-length')
+            if int(content_length) > self.max_body_size:
+                raise ValueError('Body too large')
+
+        if not isinstance(r.body, StreamingBody):
+            return super().check(r)
+
+        is_json = r.method == 'POST' and headers.get('content-type') in JSON_CONTENT_TYPES
+        r.body = StreamingBody(self._validated(r.body, is_json))
+        return None
+
+    def _validated(self, body: StreamingBody, is_json: bool) -> Iterator[bytes]:
+        validator = JSONStreamValidator(self.max_depth, self.max_token_size) if is_json else None
+        size = 0
+        for chunk in body:
+            size += len(chunk)
+            if size > self.max_body_size:
+                raise ValueError('Body too large')
+            if validator is not None:
+                validator.feed(chunk)
+            yield chunk
+
+        if validator is not None:
+            validator.close()
+
+
+def read_body(r: Request) -> int:
+    assert isinstance(r.body, StreamingBody)
+    return sum(len(chunk) for chunk in r.body)
+
+
+def main() -> None:
+    validate = StreamingValidationMiddleWare(max_body_size=1024)
+
+    def chunks(data: bytes, size: int = 16) -> Iterator[bytes]:
+        for i in range(0, len(data), size):
+            yield data[i : i + size]
+
+    bodies = {
+        'valid': b'{"name": "user", "tags": ["a", "b"], "age": 30, "admin": false, "note": "caf\\u00e9"}',
+        'malformed': b'{"name": "user", "tags": ["a", "b"} ' + b' ' * 2048,
+        'oversized': b'{"data": "' + b'x' * 4096 + b'"}',
+        'not an object': b'["user"]',
+    }
+    for label, data in bodies.items():
+        request = Request(
+            method='POST',
+            url='localhost:3000/api/users',
+            body=StreamingBody(chunks(data)),
+            headers={'content-type': 'aplication/json'},
+        )
+        try:
+            validate.handle(request)
+            print(f'{label}: read {read_body(request)} bytes')
+        except ValueError as e:
+            print(f'{label}: rejected ({e})')
+
+    try:
+        validate.handle(Request(method='POST', url='localhost:3000/api/users', headers={'content-length': '4096'}))
+    except ValueError as e:
+        print(f'content-length 4096: rejected ({e})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import marshal
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from .main import APIGateway, OrderService, ProductService
+from .main_async import AsyncAPIGateway, AsyncOrderService, AsyncProductService
+from .main_multiprocess import RemoteService
+
+
+class SlowProductService(ProductService):
+    def __init__(self, name: str, latency: float) -> None:
+        super().__init__(name)
+        self.latency = latency
+
+    def handle_request(self, event: str, data: dict[str, Any]) -> None:
+        time.sleep(self.latency)
+        super().handle_request(event, data)
+
+
+class PricingProductService(ProductService):
+    # stands in for a CPU-heavy handler, e.g. pricing rules evaluated per order
+    def __init__(self, name: str, work: int) -> None:
+        super().__init__(name)
+        self.work = work
+
+    def handle_request(self, event: str, data: dict[str, Any]) -> None:
+        data = {**data, 'price': sum(i * i % 7 for i in range(self.work))}
+        self.send('order_service', 'priced', data)
+
+
+class QuietOrderService(OrderService):
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.priced: list[str] = []
+
+    def handle_request(self, event: str, data: dict[str, Any]) -> None:
+        self.priced.append(data['order_id'])
+
+
+def make_orders(n: int) -> list[dict[str, Any]]:
+    return [{'order_id': str(i), 'product_id': str(i % 3 + 1), 'quantity': i % 7} for i in range(n)]
+
+
+def bench_sync(orders: list[dict[str, Any]], latency: float) -> float:
+    gateway = APIGateway()
+    order_service = OrderService('order_service')
+    gateway.register_service(order_service)
+    gateway.register_service(SlowProductService('product_service', latency))
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for order in orders:
+            order_service.create_order(order)
+        return time.perf_counter() - start
+
+
+async def bench_async(orders: list[dict[str, Any]], latency: float, workers: int, inbox_size: int) -> tuple[float, int]:
+    gateway = AsyncAPIGateway(verbose=False)
+    order_service = AsyncOrderService('order_service', verbose=False)
+    gateway.register_service(order_service, inbox_size=inbox_size)
+    gateway.register_service(
+        AsyncProductService('product_service', verbose=False, latency=latency),
+        inbox_size=inbox_size,
+        workers=workers,
+    )
+
+    start = time.perf_counter()
+    async with gateway:
+        await asyncio.gather(*(order_service.create_order(order) for order in orders))
+    elapsed = time.perf_counter() - start
+
+    assert len(order_service.orders) + len(order_service.cancelled) == len(orders)
+    return elapsed, gateway.stats()['product_service'].max_depth
+
+
+def bench_processes(orders: list[dict[str, Any]], work: int, processes: int) -> float:
+    gateway = APIGateway()
+    order_service = QuietOrderService('order_service')
+    gateway.register_service(order_service)
+    service = PricingProductService('product_service', work)
+    product_service = RemoteService(service, processes=processes) if processes else service
+    gateway.register_service(product_service)
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max(processes, 1)) as executor:
+            list(executor.map(order_service.create_order, orders))
+        elapsed = time.perf_counter() - start
+
+    if isinstance(product_service, RemoteService):
+        product_service.close()
+    assert len(order_service.priced) == len(orders)
+    return elapsed
+
+
+def bench_codecs(n: int) -> None:
+    message = ('send', 'order_service', 'inventory_result', make_orders(1)[0] | {'available': True})
+    for name, dumps, loads in (('marshal', marshal.dumps, marshal.loads), ('pickle', pickle.dumps, pickle.loads)):
+        start = time.perf_counter()
+        for _ in range(n):
+            loads(dumps(message))
+        elapsed = time.perf_counter() - start
+        print(f'{name:>7} | {n / elapsed:>12,.0f} round trips/s | {len(dumps(message))} bytes')
+
+
+def main() -> None:
+    for latency, n in ((0.0, 20_000), (0.001, 1_000)):
+        orders = make_orders(n)
+        elapsed = bench_sync(orders, latency)
+        print(f'latency {latency * 1e3:.0f} ms | {n:>6} orders | sync gateway: {n / elapsed:>10,.0f} orders/s')
+
+        for workers in (1, 16, 128):
+            elapsed, max_depth = asyncio.run(bench_async(orders, latency, workers, inbox_size=256))
+            print(
+                f'latency {latency * 1e3:.0f} ms | {n:>6} orders | async, {workers:>3} workers:'
+                f' {n / elapsed:>10,.0f} orders/s | max inbox depth {max_depth}'
+            )
+
+        print('-' * 30)
+
+    bench_codecs(200_000)
+
+    print('-' * 30)
+
+    orders = make_orders(400)
+    for processes in sorted({0, 1, 2, 4, os.cpu_count() or 1}):
+        elapsed = bench_processes(orders, work=20_000, processes=processes)
+        label = f'{processes} processes' if processes else 'in-process'
+        print(f'cpu-heavy handler | {label:>12}: {len(orders) / elapsed:>8,.0f} orders/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from abc import ABC, abstractmethod
+from collections import deque
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Self
+
+from .main import Order, Product
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+in_worker: ContextVar[bool] = ContextVar('in_worker', default=False)
+
+
+class AsyncServiceMediator(ABC):
+    @abstractmethod
+    async def send_request(
+        self,
+        sender: AsyncMicroservice,
+        service_name: str,
+        event: str,
+        data: dict[str, Any],
+    ) -> None: ...
+
+
+@dataclasses.dataclass
+class InboxStats:
+    handled: int = 0
+    failed: int = 0
+    max_depth: int = 0
+    blocked: int = 0
+    overflowed: int = 0
+
+
+class AsyncAPIGateway(AsyncServiceMediator):
+    # Each service gets a bounded inbox drained by its own worker tasks. send_request only waits
+    # when the target inbox is full, which is what pushes back on senders faster than the service.
+    # Sends from inside a handler never wait: with a cycle of sends (A -> B -> A) two workers could
+    # each wait on the other's full inbox forever, so those spill into an unbounded overflow that
+    # the target's workers move back into the inbox as they take requests off it.
+    def __init__(self, verbose: bool = True) -> None:
+        self.verbose = verbose
+        self._services: dict[str, AsyncMicroservice] = {}
+        self._inboxes: dict[str, asyncio.Queue[tuple[str, dict[str, Any]]]] = {}
+        self._overflow: dict[str, deque[tuple[str, dict[str, Any]]]] = {}
+        self._concurrency: dict[str, int] = {}
+        self._stats: dict[str, InboxStats] = {}
+        self._workers: list[asyncio.Task[None]] = []
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def register_service(self, service: AsyncMicroservice, inbox_size: int = 100, workers: int = 1) -> None:
+        self._services[service.name] = service
+        self._inboxes[service.name] = asyncio.Queue(maxsize=inbox_size)
+        self._overflow[service.name] = deque()
+        self._concurrency[service.name] = workers
+        self._stats[service.name] = InboxStats()
+        service.set_mediator(self)
+
+    async def send_request(
+        self,
+        sender: AsyncMicroservice,
+        service_name: str,
+        event: str,
+        data: dict[str, Any],
+    ) -> None:
+        inbox = self._inboxes.get(service_name)
+        if inbox is None:
+            print(f'Service {service_name} not found')
+            return
+
+        if self.verbose:
+            print(f'API Gateway routing request from {sender.name} to {service_name}')
+        stats = self._stats[service_name]
+        overflow = self._overflow[service_name]
+        self._pending += 1
+        self._idle.clear()
+        if in_worker.get():
+            if inbox.full() or overflow:
+                overflow.append((event, data))
+                stats.overflowed += 1
+            else:
+                inbox.put_nowait((event, data))
+        else:
+            if inbox.full():
+                stats.blocked += 1
+            try:
+                await inbox.put((event, data))
+            except BaseException:
+                self._done()
+                raise
+        stats.max_depth = max(stats.max_depth, inbox.qsize() + len(overflow))
+
+    def _done(self) -> None:
+        self._pending -= 1
+        if not self._pending:
+            self._idle.set()
+
+    async def _work(self, service: AsyncMicroservice) -> None:
+        in_worker.set(True)
+        inbox = self._inboxes[service.name]
+        overflow = self._overflow[service.name]
+        stats = self._stats[service.name]
+        while True:
+            try:
+                event, data = await inbox.get()
+                if overflow:
+                    inbox.put_nowait(overflow.popleft())
+            except asyncio.QueueShutDown:
+                return
+
+            try:
+                await service.handle_request(event, data)
+                stats.handled += 1
+            except Exception as e:
+                stats.failed += 1
+                print(f'{service.name} failed to handle {event}: {e!r}')
+            finally:
+                inbox.task_done()
+                self._done()
+
+    def start(self) -> None:
+        for name, service in self._services.items():
+            for i in range(self._concurrency[name]):
+                self._workers.append(asyncio.create_task(self._work(service), name=f'{name}-{i}'))
+
+    async def join(self) -> None:
+        # wait until every request, including the ones handlers send on, has been handled
+        await self._idle.wait()
+
+    async def stop(self) -> None:
+        for inbox in self._inboxes.values():
+            inbox.shutdown()
+        await asyncio.gather(*self._workers)
+        self._workers.clear()
+
+    def stats(self) -> dict[str, InboxStats]:
+        return dict(self._stats)
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            await self.join()
+        await self.stop()
+
+
+class AsyncMicroservice:
+    def __init__(self, name: str, mediator: AsyncServiceMediator | None = None, verbose: bool = True) -> None:
+        self.name = name
+        self.verbose = verbose
+        self._mediator = mediator
+
+    def set_mediator(self, mediator: AsyncServiceMediator) -> None:
+        self._mediator = mediator
+
+    async def send(self, service_name: str, event: str, data: dict[str, Any]) -> None:
+        if self._mediator:
+            await self._mediator.send_request(self, service_name, event, data)
+
+    @abstractmethod
+    async def handle_request(self, event: str, data: dict[str, Any]) -> None: ...
+
+
+class AsyncProductService(AsyncMicroservice):
+    def __init__(
+        self,
+        name: str,
+        mediator: AsyncServiceMediator | None = None,
+        verbose: bool = True,
+        latency: float = 0.0,
+    ) -> None:
+        super().__init__(name, mediator, verbose)
+        self.latency = latency
+        self.inventory = {
+            '1': Product('1', 10),
+            '2': Product('2', 5),
+            '3': Product('3', 0),
+        }
+
+    async def handle_request(self, event: str, data: dict[str, Any]) -> None:
+        if event == 'check_inventory':
+            order_id = data['order_id']
+            product_id = data['product_id']
+            quantity = data['quantity']
+
+            if self.verbose:
+                print(f'{self.name} checking inventory for product {product_id}')
+            # simulated lookup against an inventory database
+            await asyncio.sleep(self.latency)
+
+            available = product_id in self.inventory and self.inventory[product_id].quantity >= quantity
+
+            payload = {
+                'order_id': order_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'available': available,
+            }
+
+            await self.send('order_service', 'inventory_result', payload)
+
+
+class AsyncOrderService(AsyncMicroservice):
+    def __init__(self, name: str, mediator: AsyncServiceMediator | None = None, verbose: bool = True) -> None:
+        super().__init__(name, mediator, verbose)
+        self.orders: dict[str, Order] = {}
+        self.cancelled: set[str] = set()
+
+    async def create_order(self, data: dict[str, Any]) -> None:
+        payload = {
+            'order_id': data['order_id'],
+            'product_id': data['product_id'],
+            'quantity': data['quantity'],
+        }
+        await self.send('product_service', 'check_inventory', payload)
+
+    async def handle_request(self, event: str, data: dict[str, Any]) -> None:
+        if event == 'inventory_result':
+            if data.get('available'):
+                order = Order(data['order_id'], data['product_id'], data['quantity'])
+                self.orders[order.id] = order
+                if self.verbose:
+                    print(f'{self.name} created order {order}')
+            else:
+                self.cancelled.add(data['order_id'])
+                if self.verbose:
+                    print(f'{self.name} cancelling order {data["order_id"]}')
+
+
+async def main() -> None:
+    gateway = AsyncAPIGateway()
+
+    product_service = AsyncProductService('product_service', latency=0.01)
+    order_service = AsyncOrderService('order_service')
+
+    gateway.register_service(order_service)
+    gateway.register_service(product_service, inbox_size=2, workers=2)
+
+    orders = [
+        {'order_id': str(order_id), 'product_id': product_id, 'quantity': quantity}
+        for order_id, product_id, quantity in ((5, '1', 5), (7, '2', 10), (8, '3', 1), (9, '2', 2))
+    ]
+    async with gateway:
+        await asyncio.gather(*(order_service.create_order(order) for order in orders))
+
+    print('-' * 30)
+
+    for name, stats in gateway.stats().items():
+        print(f'{name}: {stats}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import dataclasses
+import marshal
+import multiprocessing
+import pickle
+import sys
+import threading
+from queue import SimpleQueue
+from typing import TYPE_CHECKING, Any, Literal, Self, cast
+
+from .main import APIGateway, Microservice, OrderService, ProductService, ServiceMediator
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.process import BaseProcess
+    from types import TracebackType
+
+
+# Messages are tuples of builtins, which marshal encodes faster and smaller than pickle. Anything
+# marshal rejects (e.g. a dataclass inside `data`) falls back to pickle.
+def encode(message: tuple[Any, ...]) -> bytes:
+    try:
+        return b'm' + marshal.dumps(message)
+    except ValueError:
+        return b'p' + pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(payload: bytes) -> tuple[Any, ...]:
+    if payload[:1] == b'm':
+        return cast('tuple[Any, ...]', marshal.loads(payload[1:]))
+    return cast('tuple[Any, ...]', pickle.loads(payload[1:]))
+
+
+class WorkerMediator(ServiceMediator):
+    # Stands in for the gateway inside a worker process. A send is forwarded to the parent and only
+    # returns once the parent has routed it, which keeps the nested call order of the sync gateway.
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+
+    def send_request(
+        self,
+        sender: Microservice,
+        service_name: str,
+        event: str,
+        data: dict[str, Any],
+    ) -> None:
+        self.conn.send_bytes(encode(('send', service_name, event, data)))
+        while True:
+            message = decode(self.conn.recv_bytes())
+            if message[0] == 'ack':
+                return
+            # the routed request came back to this service
+            handle(self.conn, sender, message[1], message[2])
+
+
+def handle(conn: Connection, service: Microservice, event: str, data: dict[str, Any]) -> None:
+    try:
+        service.handle_request(event, data)
+    except Exception as e:
+        conn.send_bytes(encode(('done', repr(e))))
+    else:
+        conn.send_bytes(encode(('done', None)))
+    finally:
+        sys.stdout.flush()
+
+
+def serve(conn: Connection, service: Microservice) -> None:
+    service.set_mediator(WorkerMediator(conn))
+    while True:
+        message = decode(conn.recv_bytes())
+        if message[0] == 'stop':
+            return
+        handle(conn, service, message[1], message[2])
+
+
+@dataclasses.dataclass
+class ServiceWorker:
+    process: BaseProcess
+    conn: Connection
+
+
+class RemoteService(Microservice):
+    # Proxy registered on the gateway in place of a service that runs in worker processes. Each
+    # request is handed to an idle worker; its sends are routed here until it reports done.
+    # Every worker runs its own copy of the service, so state a handler changes (e.g. inventory) is
+    # neither shared between workers nor seen by the parent; use it for stateless services or ones
+    # that keep their state in an external store.
+    def __init__(
+        self,
+        service: Microservice,
+        processes: int = 1,
+        context: Literal['fork', 'forkserver', 'spawn'] | None = None,
+    ) -> None:
+        super().__init__(service.name)
+        self._context = multiprocessing.get_context(context)
+        self._workers: list[ServiceWorker] = []
+        self._idle: SimpleQueue[ServiceWorker] = SimpleQueue()
+        self._local = threading.local()
+        for _ in range(processes):
+            conn, child_conn = self._context.Pipe()
+            process = self._context.Process(target=serve, args=(child_conn, service), daemon=True)
+            process.start()
+            child_conn.close()
+            worker = ServiceWorker(process, conn)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def handle_request(self, event: str, data: dict[str, Any]) -> None:
+        # a request routed back to this service while one of its workers waits on a send goes to
+        # that same worker, which handles it before its send returns
+        current: ServiceWorker | None = getattr(self._local, 'worker', None)
+        if current is not None:
+            self._call(current, event, data)
+            return
+
+        worker = self._idle.get()
+        self._local.worker = worker
+        try:
+            self._call(worker, event, data)
+        finally:
+            self._local.worker = None
+            self._idle.put(worker)
+
+    def _call(self, worker: ServiceWorker, event: str, data: dict[str, Any]) -> None:
+        worker.conn.send_bytes(encode(('request', event, data)))
+        error: Exception | None = None
+        while True:
+            try:
+                message = decode(worker.conn.recv_bytes())
+            except EOFError:
+                raise RuntimeError(f'{self.name} worker {worker.process.pid} exited') from None
+
+            if message[0] == 'done':
+                # keep the pipe in step: a failed send is only raised once the worker is idle again
+                if error is not None:
+                    raise error
+                if message[1] is not None:
+                    raise RuntimeError(f'{self.name} worker failed: {message[1]}')
+                return
+
+            _, service_name, sent_event, sent_data = message
+            try:
+                self.send(service_name, sent_event, sent_data)
+            except Exception as e:
+                error = error or e
+            worker.conn.send_bytes(encode(('ack',)))
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.conn.send_bytes(encode(('stop',)))
+        for worker in self._workers:
+            worker.process.join()
+            worker.conn.close()
+        self._workers.clear()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+if __name__ == '__main__':
+    gateway = APIGateway()
+
+    order_service = OrderService('order_service')
+
+    with RemoteService(ProductService('product_service'), processes=2) as product_service:
+        gateway.register_service(order_service)
+        gateway.register_service(product_service)
+
+        order_service.create_order({
+            'order_id': '5',
+            'product_id': '1',
+            'quantity': 5,
+        })
+
+        print('-' * 30)
+
+        order_service.create_order({
+            'order_id': '7',
+            'product_id': '2',
+            'quantity': 10,
+        })
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from .main import Application, Endpoint, Router
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .main import RouteComponent
+
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+
+def build_app(n_routers: int, endpoints_per_router: int, cache_size: int = 0) -> Application:
+    app = Application('Benchmark API', cache_size=cache_size)
+    api_router = Router(prefix='/api/v1')
+    for i in range(n_routers):
+        router = Router(prefix=f'/resource_{i}')
+        for j in range(endpoints_per_router):
+            router.add_router(Endpoint(METHODS[j % len(METHODS)], f'/action_{j}'))
+        router.add_router(Endpoint('GET', '/items/{item_id:int}'))
+        api_router.add_router(router)
+    app.include_router(api_router)
+    return app
+
+
+def make_requests(n_routers: int, endpoints_per_router: int, n: int) -> list[tuple[str, str]]:
+    requests: list[tuple[str, str]] = []
+    for _ in range(n):
+        i = random.randrange(n_routers)
+        j = random.randrange(endpoints_per_router)
+        requests.append((METHODS[j % len(METHODS)], f'/api/v1/resource_{i}/action_{j}'))
+    return requests
+
+
+def make_skewed_requests(n_routers: int, endpoints_per_router: int, n: int) -> list[tuple[str, str]]:
+    # a few hot routes take most of the traffic
+    hot = make_requests(n_routers, endpoints_per_router, 25)
+    hot += [('GET', f'/api/v1/resource_{random.randrange(n_routers)}/items/{i}') for i in range(25)]
+    cold = make_requests(n_routers, endpoints_per_router, n)
+    return [random.choice(hot) if random.random() < 0.9 else cold[i] for i in range(n)]
+
+
+def linear_routes(app: Application) -> list[tuple[str, str, Endpoint]]:
+    routes: list[tuple[str, str, Endpoint]] = []
+    for api_router in app.root_router.routes:
+        assert isinstance(api_router, Router)
+        for router in api_router.routes:
+            assert isinstance(router, Router)
+            for endpoint in router.routes:
+                assert isinstance(endpoint, Endpoint)
+                routes.append((endpoint.method, api_router.prefix + router.prefix + endpoint.path, endpoint))
+    return routes
+
+
+def bench_index(app: Application, requests: list[tuple[str, str]]) -> float:
+    app.compile()
+    return bench_resolve(app, requests)
+
+
+def bench_linear(routes: list[tuple[str, str, Endpoint]], requests: list[tuple[str, str]]) -> float:
+    start = time.perf_counter()
+    for method, path in requests:
+        for route_method, route_path, _ in routes:
+            if route_method == method and route_path == path:
+                break
+    return time.perf_counter() - start
+
+
+def bench_resolve(app: Application, requests: list[tuple[str, str]]) -> float:
+    start = time.perf_counter()
+    for method, path in requests:
+        app.resolve(method, path)
+    return time.perf_counter() - start
+
+
+def bench_mutations(app: Application, requests: list[tuple[str, str]], incremental: bool) -> float:
+    (api_router,) = app.root_router.routes
+    assert isinstance(api_router, Router)
+    plugins = [router for router in api_router.routes[:50] if isinstance(router, Router)]
+    lookups_per_mutation = len(requests) // len(plugins)
+
+    def mutate(mutation: Callable[[RouteComponent], None], plugin: RouteComponent) -> None:
+        if incremental:
+            mutation(plugin)
+        else:
+            app.root_router.index = None
+            mutation(plugin)
+            app.compile()
+
+    start = time.perf_counter()
+    for i, plugin in enumerate(plugins):
+        mutate(api_router.remove_router, plugin)
+        for method, path in requests[i * lookups_per_mutation : (i + 1) * lookups_per_mutation]:
+            app.resolve(method, path)
+        mutate(api_router.add_router, plugin)
+    return time.perf_counter() - start
+
+
+def build_deep_app(depth: int) -> Application:
+    app = Application('Deep API')
+    router = app.root_router
+    for i in range(depth):
+        child = Router(prefix=f'/level_{i}')
+        child.add_router(Endpoint('GET', '/status'))
+        router.add_router(child)
+        router = child
+    return app
+
+
+def bench_describe_memory(app: Application) -> tuple[int, int]:
+    tracemalloc.start()
+    app.root_router.describe()
+    _, joined_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    with open(os.devnull, 'w', encoding='utf-8') as file:
+        app.write_routes(file)
+    _, streamed_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return joined_peak, streamed_peak
+
+
+def bench_startup(n_routers: int, endpoints_per_router: int, route_table: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    app = build_app(n_routers, endpoints_per_router)
+    build = time.perf_counter() - start
+
+    app.save_route_table(route_table)
+
+    start = time.perf_counter()
+    loaded_app = Application.load_route_table('Benchmark API', route_table)
+    load = time.perf_counter() - start
+
+    assert loaded_app.index.size == app.index.size
+    return build, load
+
+
+def main() -> None:
+    random.seed(0)
+    endpoints_per_router = 10
+    for n_routers in (10, 100, 1_000, 5_000):
+        app = build_app(n_routers, endpoints_per_router)
+        requests = make_requests(n_routers, endpoints_per_router, 1_000)
+        linear = bench_linear(linear_routes(app), requests)
+        indexed = bench_index(app, requests)
+        print(
+            f'{app.index.size:>7} endpoints | linear: {len(requests) / linear:>12,.0f} req/s'
+            f' | index: {len(requests) / indexed:>12,.0f} req/s'
+        )
+
+    print('-' * 30)
+
+    for n_routers in (100, 1_000, 2_000):
+        app = build_app(n_routers, endpoints_per_router)
+        requests = make_requests(n_routers, endpoints_per_router, 10_000)
+        rebuild = bench_mutations(app, requests, incremental=False)
+        incremental = bench_mutations(app, requests, incremental=True)
+        print(
+            f'{app.index.size:>7} endpoints, 100 mutations + {len(requests)} lookups'
+            f' | rebuild: {rebuild:.3f}s | incremental: {incremental:.3f}s'
+        )
+
+    print('-' * 30)
+
+    n_routers = 5_000
+    requests = make_skewed_requests(n_routers, endpoints_per_router, 100_000)
+    uncached = bench_resolve(build_app(n_routers, endpoints_per_router), requests)
+    cached_app = build_app(n_routers, endpoints_per_router, cache_size=256)
+    cached = bench_resolve(cached_app, requests)
+    assert cached_app.cache is not None
+    print(
+        f'{cached_app.index.size:>7} endpoints, skewed traffic'
+        f' | index: {len(requests) / uncached:>12,.0f} req/s | cached: {len(requests) / cached:>12,.0f} req/s'
+        f' | hit ratio {cached_app.cache.stats()["hit_ratio"]:.2f}'
+    )
+
+    print('-' * 30)
+
+    for label, app in (
+        ('110k endpoints', build_app(10_000, endpoints_per_router)),
+        ('depth 5k routers', build_deep_app(5_000)),
+    ):
+        joined_peak, streamed_peak = bench_describe_memory(app)
+        print(
+            f'{label:>16} | describe(): {joined_peak / 1024:>10,.0f} KiB peak'
+            f' | write_routes(): {streamed_peak / 1024:>10,.0f} KiB peak'
+        )
+
+    print('-' * 30)
+
+    with tempfile.TemporaryDirectory() as directory:
+        route_table = os.path.join(directory, 'routes.bin')
+        for n_routers in (1_000, 10_000):
+            build, load = bench_startup(n_routers, endpoints_per_router, route_table)
+            print(
+                f'{n_routers * (endpoints_per_router + 1):>7} endpoints | build tree: {build:.3f}s'
+                f' | load route table: {load:.3f}s ({os.path.getsize(route_table) / 1024:,.0f} KiB)'
+            )
+
+
+if __name__ == '__main__':
+    main()
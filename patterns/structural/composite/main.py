@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+import os
+import sys
+import tempfile
 from abc import ABC, abstractmethod
-from typing import override
+from typing import TYPE_CHECKING, Self, TextIO, override
+
+from .routing import RouteCache, RouteIndex, dump_route_table, load_route_table
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from .routing import RouteMatch
 
 
 class RouteComponent(ABC):
+    _parent: RouteComponent | None = None
+
     @property
     def parent(self) -> RouteComponent | None:
         return self._parent
@@ -16,6 +28,12 @@ class RouteComponent(ABC):
     def is_router(self) -> bool:
         return isinstance(self, Router)
 
+    def root(self) -> RouteComponent:
+        component = self
+        while component.parent is not None:
+            component = component.parent
+        return component
+
     def add_router(self, component: RouteComponent) -> None: ...
 
     def remove_router(self, component: RouteComponent) -> None: ...
@@ -29,21 +47,44 @@ class Endpoint(RouteComponent):
         self.method = method
         self.path = path
 
+    def full_path(self) -> str:
+        return self.parent.full_prefix() + self.path if isinstance(self.parent, Router) else self.path
+
     @override
     def describe(self) -> str:
         return f'Endpoint(method={self.method} path={self.path})'
 
+    def __repr__(self) -> str:
+        return self.describe()
+
 
 class Router(RouteComponent):
     def __init__(self, prefix: str = '') -> None:
         self.prefix = prefix
         self.routes: list[RouteComponent] = []
+        self.index: RouteIndex | None = None
+
+    def full_prefix(self) -> str:
+        prefixes: list[str] = []
+        component: RouteComponent | None = self
+        while isinstance(component, Router):
+            prefixes.append(component.prefix)
+            component = component.parent
+        return ''.join(reversed(prefixes))
+
+    def root_index(self) -> RouteIndex | None:
+        root = self.root()
+        return root.index if isinstance(root, Router) else None
 
     @override
     def add_router(self, route: RouteComponent) -> None:
         self.routes.append(route)
         route.parent = self
 
+        index = self.root_index()
+        if index is not None:
+            index.insert_many(iter_endpoints(route, self.full_prefix()))
+
     @override
     def remove_router(self, route: RouteComponent) -> None:
         try:
@@ -53,37 +94,122 @@ class Router(RouteComponent):
         else:
             route.parent = None
 
+            index = self.root_index()
+            if index is not None:
+                index.remove_many(iter_endpoints(route, self.full_prefix()))
+
+    def iter_describe(self) -> Iterator[str]:
+        for _, component in walk(self):
+            if isinstance(component, Router):
+                yield component.prefix
+                if not component.routes:
+                    yield ''
+            else:
+                yield component.describe()
+
     @override
     def describe(self) -> str:
-        result = '\n'.join([str(route.describe()) for route in self.routes])
-
-        # x = []
-        # for route in self.routes:
-        #     x.append(str(route.describe()))
+        return '\n'.join(self.iter_describe())
+
+
+# Pre-order walk yielding each component with the prefixes of the routers above it (the router's
+# own prefix included). The list is shared and updated in place, so memory grows with the tree
+# depth, not with its size.
+def walk(component: RouteComponent) -> Iterator[tuple[list[str], RouteComponent]]:
+    prefixes: list[str] = []
+    if not isinstance(component, Router):
+        yield prefixes, component
+        return
+
+    prefixes.append(component.prefix)
+    yield prefixes, component
+    stack: list[Iterator[RouteComponent]] = [iter(component.routes)]
+    while stack:
+        route = next(stack[-1], None)
+        if route is None:
+            stack.pop()
+            prefixes.pop()
+        elif isinstance(route, Router):
+            prefixes.append(route.prefix)
+            yield prefixes, route
+            stack.append(iter(route.routes))
+        else:
+            yield prefixes, route
 
-        # result = '\n'.join(x)
 
-        return self.prefix + '\n' + result
+def iter_endpoints(component: RouteComponent, prefix: str = '') -> Iterator[tuple[str, Endpoint]]:
+    for prefixes, route in walk(component):
+        if isinstance(route, Endpoint):
+            yield prefix + ''.join(prefixes) + route.path, route
 
 
 class Application:
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, cache_size: int = 0) -> None:
         self.name = name
         self.root_router = Router()
+        self.root_router.index = RouteIndex()
+        self.cache_size = cache_size
+        self.cache = RouteCache(self.root_router.index, cache_size) if cache_size else None
+
+    @property
+    def index(self) -> RouteIndex:
+        assert self.root_router.index is not None
+        return self.root_router.index
 
     def include_router(self, router: Router) -> None:
         self.root_router.add_router(router)
 
+    def compile(self) -> RouteIndex:
+        index = RouteIndex()
+        index.insert_many(iter_endpoints(self.root_router))
+        self.root_router.index = index
+        if self.cache_size:
+            self.cache = RouteCache(index, self.cache_size)
+        return index
+
+    def resolve(self, method: str, path: str) -> RouteMatch | None:
+        if self.cache is not None:
+            return self.cache.resolve(method, path)
+        return self.index.resolve(method, path)
+
     def describe(self) -> None:
         print(f'Application: {self.name}')
-        print(self.root_router.describe())
+        for line in self.root_router.iter_describe():
+            print(line)
+
+    def iter_routes(self) -> Iterator[str]:
+        for path, endpoint in iter_endpoints(self.root_router):
+            yield f'{endpoint.method} {path}'
+
+    def write_routes(self, file: TextIO) -> None:
+        file.writelines(f'{route}\n' for route in self.iter_routes())
+
+    def save_route_table(self, path: str | os.PathLike[str]) -> None:
+        with open(path, 'wb') as file:
+            file.write(dump_route_table(self.index))
+
+    # Loads a saved route table in place of rebuilding the router tree. The routes come back as
+    # endpoints with full paths directly under the root router.
+    @classmethod
+    def load_route_table(cls, name: str, path: str | os.PathLike[str], cache_size: int = 0) -> Self:
+        with open(path, 'rb') as file:
+            index, endpoints = load_route_table(file.read(), Endpoint)
+
+        app = cls(name, cache_size=cache_size)
+        for endpoint in endpoints:
+            endpoint.parent = app.root_router
+        app.root_router.routes.extend(endpoints)
+        app.root_router.index = index
+        if cache_size:
+            app.cache = RouteCache(index, cache_size)
+        return app
 
 
 def client_code() -> None: ...
 
 
 def main() -> None:
-    app = Application('My API')
+    app = Application('My API', cache_size=128)
 
     # api
     api_router = Router(prefix='/api/v1')
@@ -93,6 +219,8 @@ def main() -> None:
     user_router.add_router(Endpoint('GET', '/get_user'))
     user_router.add_router(Endpoint('PUT', '/update_user'))
     user_router.add_router(Endpoint('DELETE', '/delete_user'))
+    user_router.add_router(Endpoint('GET', '/{user_id:int}'))
+    user_router.add_router(Endpoint('GET', '/me'))
 
     # books
     book_router = Router(prefix='/books')
@@ -106,6 +234,10 @@ def main() -> None:
     book_publishers = Router(prefix='/publishers')
     book_publishers.add_router(Endpoint('POST', '/add_book_publisher'))
 
+    # files
+    file_router = Router(prefix='/files')
+    file_router.add_router(Endpoint('GET', '/*file_path'))
+
     # -
 
     # /api/users
@@ -119,10 +251,59 @@ def main() -> None:
     # api/books/publishers
     book_router.add_router(book_publishers)
 
+    # /api/files
+    api_router.add_router(file_router)
+
     # add api to app
     app.include_router(api_router)
     app.describe()
 
+    print('-' * 30)
+
+    app.write_routes(sys.stdout)
+
+    print('-' * 30)
+
+    for method, path in [
+        ('GET', '/api/v1/users/get_user'),
+        ('POST', '/api/v1/books/authors/add_book_author'),
+        ('GET', '/api/v1/books/authors/add_book_author'),
+        ('GET', '/api/v1/users/42'),
+        ('GET', '/api/v1/users/me'),
+        ('GET', '/api/v1/users/someone'),
+        ('GET', '/api/v1/files/images/avatar.png'),
+    ]:
+        print(f'{method} {path} ->', app.resolve(method, path))
+
+    print('-' * 30)
+
+    # routes follow the tree after it is attached to the app
+    book_router.remove_router(book_authors)
+    user_router.add_router(Endpoint('POST', '/create_user'))
+    print(f'index version {app.index.version}, {app.index.size} routes')
+    print('POST /api/v1/books/authors/add_book_author ->', app.resolve('POST', '/api/v1/books/authors/add_book_author'))
+    print('POST /api/v1/users/create_user ->', app.resolve('POST', '/api/v1/users/create_user'))
+
+    print('-' * 30)
+
+    for _ in range(3):
+        app.resolve('GET', '/api/v1/users/me')
+    app.resolve('GET', '/api/v1/users/7')
+
+    if app.cache is not None:
+        print('route cache:', app.cache.stats())
+        for endpoint, hits in app.cache.hot_endpoints(3):
+            print(f'{hits:>3} {endpoint.method} {endpoint.full_path()}')
+
+    print('-' * 30)
+
+    with tempfile.TemporaryDirectory() as directory:
+        route_table = os.path.join(directory, 'routes.bin')
+        app.save_route_table(route_table)
+        loaded_app = Application.load_route_table('My API (loaded)', route_table)
+        print(f'loaded {loaded_app.index.size} routes from {os.path.getsize(route_table)} bytes')
+        print('GET /api/v1/users/42 ->', loaded_app.resolve('GET', '/api/v1/users/42'))
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import dataclasses
+import gc
+import marshal
+import re
+import struct
+import uuid
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from .main import Endpoint
+
+
+@dataclasses.dataclass(frozen=True)
+class Converter:
+    name: str
+    pattern: re.Pattern[str]
+    convert: Callable[[str], Any]
+    priority: int
+
+
+CONVERTERS = {
+    converter.name: converter
+    for converter in (
+        Converter('int', re.compile(r'-?\d+'), int, 0),
+        Converter('float', re.compile(r'-?\d+(\.\d+)?'), float, 1),
+        Converter('uuid', re.compile(r'[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}'), uuid.UUID, 2),
+        Converter('str', re.compile(r'[^/]+'), str, 3),
+    )
+}
+
+
+@dataclasses.dataclass
+class Route:
+    endpoint: Endpoint
+    param_names: tuple[str, ...]
+
+
+@dataclasses.dataclass
+class RouteMatch:
+    endpoint: Endpoint
+    params: dict[str, Any]
+
+
+def split_path(path: str) -> list[str]:
+    return [segment for segment in path.split('/') if segment]
+
+
+# Route table file: a header followed by the compiled trie as nested tuples in marshal format, so
+# loading skips path parsing entirely. Only load files written by dump_route_table.
+ROUTE_TABLE_HEADER = struct.Struct('<4sHB')
+ROUTE_TABLE_MAGIC = b'RTBL'
+ROUTE_TABLE_VERSION = 1
+
+type DumpedNode = tuple[
+    tuple[tuple[str, str, tuple[str, ...]], ...],
+    tuple[tuple[str, DumpedNode], ...],
+    tuple[tuple[str, DumpedNode], ...],
+    DumpedNode | None,
+]
+
+
+def dump_node(node: RouteNode) -> DumpedNode:
+    return (
+        tuple((method, route.endpoint.full_path(), route.param_names) for method, route in node.routes.items()),
+        tuple((segment, dump_node(child)) for segment, child in node.children.items()),
+        tuple((converter.name, dump_node(child)) for converter, child in node.params),
+        None if node.wildcard is None else dump_node(node.wildcard),
+    )
+
+
+def load_node(
+    dumped: DumpedNode, endpoint_factory: Callable[[str, str], Endpoint], endpoints: list[Endpoint]
+) -> RouteNode:
+    dumped_routes, dumped_children, dumped_params, dumped_wildcard = dumped
+    node = RouteNode()
+    for method, path, param_names in dumped_routes:
+        endpoint = endpoint_factory(method, path)
+        endpoints.append(endpoint)
+        node.routes[method] = Route(endpoint, param_names)
+    for segment, child in dumped_children:
+        node.children[segment] = load_node(child, endpoint_factory, endpoints)
+    for converter_name, child in dumped_params:
+        node.params.append((CONVERTERS[converter_name], load_node(child, endpoint_factory, endpoints)))
+    if dumped_wildcard is not None:
+        node.wildcard = load_node(dumped_wildcard, endpoint_factory, endpoints)
+    return node
+
+
+def dump_route_table(index: RouteIndex) -> bytes:
+    header = ROUTE_TABLE_HEADER.pack(ROUTE_TABLE_MAGIC, ROUTE_TABLE_VERSION, marshal.version)
+    return header + marshal.dumps(dump_node(index.root))
+
+
+def load_route_table(
+    data: bytes, endpoint_factory: Callable[[str, str], Endpoint]
+) -> tuple[RouteIndex, list[Endpoint]]:
+    magic, version, marshal_version = ROUTE_TABLE_HEADER.unpack_from(data)
+    if magic != ROUTE_TABLE_MAGIC or version != ROUTE_TABLE_VERSION or marshal_version != marshal.version:
+        raise ValueError('Not a compatible route table file')
+
+    # the loaded trie is one big batch of long-lived objects, so skip GC passes while building it
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        endpoints: list[Endpoint] = []
+        index = RouteIndex()
+        index.root = load_node(marshal.loads(data[ROUTE_TABLE_HEADER.size :]), endpoint_factory, endpoints)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    index.size = len(endpoints)
+    return index, endpoints
+
+
+class RouteNode:
+    __slots__ = ('children', 'params', 'routes', 'wildcard')
+
+    def __init__(self) -> None:
+        self.children: dict[str, RouteNode] = {}
+        self.params: list[tuple[Converter, RouteNode]] = []
+        self.wildcard: RouteNode | None = None
+        self.routes: dict[str, Route] = {}
+
+    def copy(self) -> RouteNode:
+        node = RouteNode()
+        node.children = self.children.copy()
+        node.params = self.params.copy()
+        node.wildcard = self.wildcard
+        node.routes = self.routes.copy()
+        return node
+
+    def is_empty(self) -> bool:
+        return not (self.children or self.params or self.wildcard or self.routes)
+
+    def get_child(self, edge: Edge) -> RouteNode | None:
+        match edge:
+            case Converter():
+                return next((child for converter, child in self.params if converter is edge), None)
+            case None:
+                return self.wildcard
+            case _:
+                return self.children.get(edge)
+
+    def set_child(self, edge: Edge, child: RouteNode) -> None:
+        match edge:
+            case Converter():
+                self.params = [param for param in self.params if param[0] is not edge]
+                self.params.append((edge, child))
+                self.params.sort(key=lambda param: param[0].priority)
+            case None:
+                self.wildcard = child
+            case _:
+                self.children[edge] = child
+
+    def drop_child(self, edge: Edge) -> None:
+        match edge:
+            case Converter():
+                self.params = [param for param in self.params if param[0] is not edge]
+            case None:
+                self.wildcard = None
+            case _:
+                self.children.pop(edge, None)
+
+
+# a static segment, a typed param, or None for the trailing wildcard
+type Edge = str | Converter | None
+
+
+def parse_path(path: str) -> tuple[list[Edge], tuple[str, ...]]:
+    edges: list[Edge] = []
+    param_names: list[str] = []
+    segments = split_path(path)
+    for i, segment in enumerate(segments):
+        if segment.startswith('*'):
+            if i != len(segments) - 1:
+                raise ValueError(f'Wildcard must be the last segment: {path}')
+            param_names.append(segment[1:])
+            edges.append(None)
+        elif segment.startswith('{') and segment.endswith('}'):
+            name, _, converter_name = segment[1:-1].partition(':')
+            converter = CONVERTERS.get(converter_name or 'str')
+            if converter is None:
+                raise ValueError(f'Unknown path converter {converter_name!r} in {path}')
+            param_names.append(name)
+            edges.append(converter)
+        else:
+            edges.append(segment)
+    return edges, tuple(param_names)
+
+
+class Transaction:
+    # Copy-on-write over the published trie: nodes are cloned the first time a change touches
+    # them, so lookups holding the old root keep seeing a complete, unchanged snapshot.
+    def __init__(self, root: RouteNode) -> None:
+        self.fresh: set[int] = set()
+        self.root = self.writable(root)
+        self.size_delta = 0
+
+    def writable(self, node: RouteNode) -> RouteNode:
+        if id(node) in self.fresh:
+            return node
+        node = node.copy()
+        self.fresh.add(id(node))
+        return node
+
+    def insert(self, path: str, endpoint: Endpoint) -> None:
+        edges, param_names = parse_path(path)
+        node = self.root
+        for edge in edges:
+            child = node.get_child(edge)
+            child = RouteNode() if child is None else self.writable(child)
+            self.fresh.add(id(child))
+            node.set_child(edge, child)
+            node = child
+
+        if endpoint.method not in node.routes:
+            self.size_delta += 1
+        node.routes[endpoint.method] = Route(endpoint, param_names)
+
+    def remove(self, path: str, endpoint: Endpoint) -> None:
+        edges, _ = parse_path(path)
+        trail: list[tuple[RouteNode, Edge]] = []
+        node = self.root
+        for edge in edges:
+            child = node.get_child(edge)
+            if child is None:
+                return
+            trail.append((node, edge))
+            node = child
+
+        route = node.routes.get(endpoint.method)
+        if route is None or route.endpoint is not endpoint:
+            return
+
+        # clone the path down to the leaf, then prune nodes left empty
+        node = self.root
+        for i, (_, edge) in enumerate(trail):
+            child = node.get_child(edge)
+            assert child is not None
+            child = self.writable(child)
+            node.set_child(edge, child)
+            trail[i] = (node, edge)
+            node = child
+
+        del node.routes[endpoint.method]
+        self.size_delta -= 1
+        for parent, edge in reversed(trail):
+            if not node.is_empty():
+                break
+            parent.drop_child(edge)
+            node = parent
+
+
+class RouteIndex:
+    def __init__(self) -> None:
+        self.root = RouteNode()
+        self.size = 0
+        self.version = 0
+        self._lock = Lock()
+
+    def insert(self, path: str, endpoint: Endpoint) -> None:
+        self.insert_many([(path, endpoint)])
+
+    def insert_many(self, entries: Iterable[tuple[str, Endpoint]]) -> None:
+        with self._lock:
+            transaction = Transaction(self.root)
+            for path, endpoint in entries:
+                transaction.insert(path, endpoint)
+            self._publish(transaction)
+
+    def remove_many(self, entries: Iterable[tuple[str, Endpoint]]) -> None:
+        with self._lock:
+            transaction = Transaction(self.root)
+            for path, endpoint in entries:
+                transaction.remove(path, endpoint)
+            self._publish(transaction)
+
+    def _publish(self, transaction: Transaction) -> None:
+        self.root = transaction.root
+        self.size += transaction.size_delta
+        self.version += 1
+
+    def resolve(self, method: str, path: str) -> RouteMatch | None:
+        segments = split_path(path)
+        root = self.root
+
+        # fast path for fully static routes
+        node = root
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                break
+            node = child
+        else:
+            route = node.routes.get(method)
+            if route is not None:
+                return RouteMatch(route.endpoint, {})
+
+        values: list[Any] = []
+        route = self._match(root, segments, 0, method, values)
+        if route is None:
+            return None
+        return RouteMatch(route.endpoint, dict(zip(route.param_names, values, strict=True)))
+
+    # Static children are tried before typed params, and params before wildcards. Each trie node
+    # sits at a single depth, so a lookup visits every node at most once.
+    def _match(self, node: RouteNode, segments: list[str], i: int, method: str, values: list[Any]) -> Route | None:
+        if i == len(segments):
+            return node.routes.get(method)
+
+        segment = segments[i]
+        child = node.children.get(segment)
+        if child is not None:
+            route = self._match(child, segments, i + 1, method, values)
+            if route is not None:
+                return route
+
+        for converter, param_child in node.params:
+            if converter.pattern.fullmatch(segment) is None:
+                continue
+            values.append(converter.convert(segment))
+            route = self._match(param_child, segments, i + 1, method, values)
+            if route is not None:
+                return route
+            values.pop()
+
+        if node.wildcard is not None and method in node.wildcard.routes:
+            values.append('/'.join(segments[i:]))
+            return node.wildcard.routes[method]
+        return None
+
+
+class RouteCache:
+    def __init__(self, index: RouteIndex, maxsize: int = 1024) -> None:
+        self.index = index
+        self.maxsize = maxsize
+        self.version = index.version
+        self.hits = 0
+        self.misses = 0
+        self.endpoint_hits: Counter[Endpoint] = Counter()
+        self._entries: OrderedDict[tuple[str, str], RouteMatch | None] = OrderedDict()
+        self._lock = Lock()
+
+    def resolve(self, method: str, path: str) -> RouteMatch | None:
+        key = (method, path)
+        with self._lock:
+            if self.version != self.index.version:
+                self._entries.clear()
+                self.version = self.index.version
+
+            # cached misses are stored as None, so membership tells a cached miss from an uncached path
+            if key in self._entries:
+                match = self._entries[key]
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if match is not None:
+                    self.endpoint_hits[match.endpoint] += 1
+                return match
+            version = self.version
+
+        match = self.index.resolve(method, path)
+
+        with self._lock:
+            self.misses += 1
+            if match is not None:
+                self.endpoint_hits[match.endpoint] += 1
+            if version == self.index.version:
+                self._entries[key] = match
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return match
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+        }
+
+    def hot_endpoints(self, n: int = 10) -> list[tuple[Endpoint, int]]:
+        with self._lock:
+            return self.endpoint_hits.most_common(n)
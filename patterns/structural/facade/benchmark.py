@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+
+from .main import Book, BookRow, BookStoreAPIFacade
+
+
+# a plain __dict__ class on purpose: it is the baseline the slotted Book is measured against
+class DictBook:  # noqa: B903
+    def __init__(self, id: int, title: str, author_id: int, publisher_id: int) -> None:
+        self.id = id
+        self.title = title
+        self.author_id = author_id
+        self.publisher_id = publisher_id
+
+
+def make_rows(n: int) -> list[BookRow]:
+    return [BookRow(title=f'book {i}', author_id=i % 3 + 1, publisher_id=i % 3 + 1) for i in range(n)]
+
+
+def bench_create_book(facade: BookStoreAPIFacade, rows: list[BookRow]) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        facade.create_book(title=row.title, author_id=row.author_id, publisher_id=row.publisher_id)
+    return time.perf_counter() - start
+
+
+def bench_create_books(facade: BookStoreAPIFacade, rows: list[BookRow]) -> float:
+    start = time.perf_counter()
+    facade.create_books(rows)
+    return time.perf_counter() - start
+
+
+def bench_memory(book_cls: type[Book | DictBook], n: int) -> int:
+    titles = [f'book {i}' for i in range(n)]
+    tracemalloc.start()
+    books = [book_cls(i, titles[i], i % 3 + 1, i % 3 + 1) for i in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del books
+    return size
+
+
+def main() -> None:
+    facade = BookStoreAPIFacade()
+
+    for n in (1_000, 10_000, 100_000):
+        rows = make_rows(n)
+        per_row = bench_create_book(facade, rows)
+        bulk = bench_create_books(facade, rows)
+        print(
+            f'{n:>7} rows | create_book: {n / per_row:>12,.0f} rows/s'
+            f' | create_books: {n / bulk:>12,.0f} rows/s | x{per_row / bulk:.1f}'
+        )
+
+    print('-' * 30)
+
+    n = 100_000
+    dict_size = bench_memory(DictBook, n)
+    slots_size = bench_memory(Book, n)
+    print(f'{n} records | __dict__: {dict_size / n:.0f} B/record | __slots__: {slots_size / n:.0f} B/record')
+
+
+if __name__ == '__main__':
+    main()
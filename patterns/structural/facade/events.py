@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import bisect
+import sys
+from abc import ABC, abstractmethod
+from collections import Counter
+from queue import SimpleQueue
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from .main import Book, CreateBooksResult
+
+
+class BookStoreListener(ABC):
+    @abstractmethod
+    def book_created(self, book: Book, elapsed: float) -> None: ...
+
+    @abstractmethod
+    def create_failed(self, error: ValueError, elapsed: float) -> None: ...
+
+    def books_created(self, result: CreateBooksResult, elapsed: float) -> None:
+        for book in result.books:
+            self.book_created(book, elapsed / len(result.books))
+
+
+class Histogram:
+    # upper bounds in seconds, from 1us to 10s
+    bounds = tuple(10 ** (exponent / 2) for exponent in range(-12, 3))
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets, strict=False):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class MetricsListener(BookStoreListener):
+    def __init__(self) -> None:
+        self.counters: Counter[str] = Counter()
+        # single creates and whole batches are timed apart, a batch would otherwise skew the per-book quantiles
+        self.latency = Histogram()
+        self.batch_latency = Histogram()
+        self._lock = Lock()
+
+    def book_created(self, book: Book, elapsed: float) -> None:
+        with self._lock:
+            self.counters['books_created'] += 1
+            self.latency.observe(elapsed)
+
+    def create_failed(self, error: ValueError, elapsed: float) -> None:
+        with self._lock:
+            self.counters['create_failed'] += 1
+            self.latency.observe(elapsed)
+
+    def books_created(self, result: CreateBooksResult, elapsed: float) -> None:
+        with self._lock:
+            self.counters['books_created'] += len(result.books)
+            self.counters['create_failed'] += len(result.errors)
+            self.batch_latency.observe(elapsed)
+
+    def snapshot(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                **self.counters,
+                'latency': self.latency.snapshot(),
+                'batch_latency': self.batch_latency.snapshot(),
+            }
+
+
+class LogListener(BookStoreListener):
+    def __init__(self, stream: TextIO = sys.stdout, batch_size: int = 256) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self._queue: SimpleQueue[str | None] = SimpleQueue()
+        self._writer = Thread(target=self._write_lines, daemon=True)
+        self._writer.start()
+
+    def _write_lines(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            while len(lines) < self.batch_size and not self._queue.empty():
+                lines.append(self._queue.get())
+
+            closed = None in lines
+            self.stream.write(''.join(f'{line}\n' for line in lines if line is not None))
+            self.stream.flush()
+            if closed:
+                return
+
+    def book_created(self, book: Book, elapsed: float) -> None:
+        self._queue.put(f'Add new book: {book}')
+
+    def create_failed(self, error: ValueError, elapsed: float) -> None:
+        self._queue.put(f'Failed to add book: {error}')
+
+    def books_created(self, result: CreateBooksResult, elapsed: float) -> None:
+        self._queue.put(f'Add {len(result.books)} new books, {len(result.errors)} rejected')
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._writer.join()
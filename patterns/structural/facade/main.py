@@ -1,4 +1,26 @@
+from __future__ import annotations
+
+import dataclasses
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from threading import RLock
+from typing import TYPE_CHECKING
+
+from .events import LogListener, MetricsListener
+from .storage import FileStore, MemoryStore
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from .events import BookStoreListener
+    from .storage import Page, RecordStore
+
+
 class Book:
+    __slots__ = ('author_id', 'id', 'publisher_id', 'title')
+
     def __init__(self, id: int, title: str, author_id: int, publisher_id: int) -> None:
         self.id = id
         self.title = title
@@ -10,6 +32,8 @@ class Book:
 
 
 class Author:
+    __slots__ = ('id', 'name')
+
     def __init__(self, id: int, name: str) -> None:
         self.id = id
         self.name = name
@@ -19,6 +43,8 @@ class Author:
 
 
 class Publisher:
+    __slots__ = ('id', 'name')
+
     def __init__(self, id: int, name: str) -> None:
         self.id = id
         self.name = name
@@ -27,69 +53,189 @@ class Publisher:
         return f'Publisher(id={self.id!r}, name={self.name!r})'
 
 
+class IdAllocator:
+    # Writers hold `lock` across allocate and the store append, so records reach the store in id
+    # order and paged scans stay stable while adds run concurrently.
+    def __init__(self, start: int = 1) -> None:
+        self._next_id = start
+        self.lock = RLock()
+
+    def allocate(self, count: int = 1) -> int:
+        with self.lock:
+            first_id = self._next_id
+            self._next_id += count
+        return first_id
+
+
+def group_by[T](items: Iterable[T], key: Callable[[T], int]) -> defaultdict[int, list[T]]:
+    groups: defaultdict[int, list[T]] = defaultdict(list)
+    for item in items:
+        groups[key(item)].append(item)
+    return groups
+
+
+@dataclasses.dataclass
+class BookRow:
+    title: str
+    author_id: int
+    publisher_id: int
+
+
+@dataclasses.dataclass
+class CreateBooksResult:
+    books: list[Book] = dataclasses.field(default_factory=list[Book])
+    errors: dict[int, str] = dataclasses.field(default_factory=dict[int, str])
+
+
+@dataclasses.dataclass
+class BookDetail:
+    book: Book
+    author: Author
+    publisher: Publisher
+
+
 class BookAPI:
-    data = [
-        Book(1, 'book 1', 1, 1),
-        Book(2, 'book 2', 1, 1),
-        Book(3, 'book 3', 2, 2),
-    ]
+    def __init__(self, store: RecordStore[Book] | None = None) -> None:
+        if store is None:
+            store = MemoryStore([
+                Book(1, 'book 1', 1, 1),
+                Book(2, 'book 2', 1, 1),
+                Book(3, 'book 3', 2, 2),
+            ])
+        self.store = store
+        self.id_allocator = IdAllocator(self.store.max_id() + 1)
+        self._by_author: defaultdict[int, list[Book]] | None = None
+        self._by_publisher: defaultdict[int, list[Book]] | None = None
+
+    # The indexes are built on first use under the allocator lock, so an add cannot land between the
+    # scan and the assignment. Building one reads every book, which on a FileStore means holding
+    # the whole store in memory from then on.
+    @property
+    def by_author(self) -> defaultdict[int, list[Book]]:
+        if self._by_author is None:
+            with self.id_allocator.lock:
+                if self._by_author is None:
+                    self._by_author = group_by(self.store, lambda book: book.author_id)
+        return self._by_author
+
+    @property
+    def by_publisher(self) -> defaultdict[int, list[Book]]:
+        if self._by_publisher is None:
+            with self.id_allocator.lock:
+                if self._by_publisher is None:
+                    self._by_publisher = group_by(self.store, lambda book: book.publisher_id)
+        return self._by_publisher
 
     def read_all(self) -> list[Book]:
-        return self.data
+        return self.store.all()
 
     def read(self, id: int) -> Book | None:
-        for book in self.data:
-            if book.id == id:
-                return book
-        return None
+        return self.store.get(id)
+
+    def read_page(self, cursor: int | None = None, limit: int = 100) -> Page[Book]:
+        return self.store.page(cursor=cursor, limit=limit)
+
+    def stream(self, batch_size: int = 1000) -> Iterator[Book]:
+        return self.store.stream(batch_size=batch_size)
+
+    def read_by_author(self, author_id: int) -> list[Book]:
+        return list(self.by_author.get(author_id, ()))
+
+    def read_by_publisher(self, publisher_id: int) -> list[Book]:
+        return list(self.by_publisher.get(publisher_id, ()))
 
     def add(self, title: str, authod_id: int, publisher_id: int) -> Book:
-        max_id = max(book.id for book in self.data)
-        new_book = Book(id=max_id + 1, title=title, author_id=authod_id, publisher_id=publisher_id)
-        self.data.append(new_book)
+        with self.id_allocator.lock:
+            book_id = self.id_allocator.allocate()
+            new_book = Book(id=book_id, title=title, author_id=authod_id, publisher_id=publisher_id)
+            self.store.append(new_book)
+            self._index_books([new_book])
         return new_book
 
+    def add_many(self, rows: list[BookRow]) -> list[Book]:
+        with self.id_allocator.lock:
+            first_id = self.id_allocator.allocate(len(rows))
+            new_books = [
+                Book(id=new_id, title=row.title, author_id=row.author_id, publisher_id=row.publisher_id)
+                for new_id, row in enumerate(rows, start=first_id)
+            ]
+            self.store.extend(new_books)
+            self._index_books(new_books)
+        return new_books
+
+    def _index_books(self, books: list[Book]) -> None:
+        if self._by_author is not None:
+            for book in books:
+                self._by_author[book.author_id].append(book)
+        if self._by_publisher is not None:
+            for book in books:
+                self._by_publisher[book.publisher_id].append(book)
+
 
 class AuthorAPI:
-    data = [
-        Author(1, 'author 1'),
-        Author(2, 'author 2'),
-        Author(3, 'author 3'),
-    ]
+    def __init__(self, store: RecordStore[Author] | None = None) -> None:
+        if store is None:
+            store = MemoryStore([
+                Author(1, 'author 1'),
+                Author(2, 'author 2'),
+                Author(3, 'author 3'),
+            ])
+        self.store = store
+        self.id_allocator = IdAllocator(self.store.max_id() + 1)
 
     def read_all(self) -> list[Author]:
-        return self.data
+        return self.store.all()
 
     def read(self, id: int) -> Author | None:
-        for author in self.data:
-            if author.id == id:
-                return author
-        return None
+        return self.store.get(id)
+
+    def read_page(self, cursor: int | None = None, limit: int = 100) -> Page[Author]:
+        return self.store.page(cursor=cursor, limit=limit)
+
+    def stream(self, batch_size: int = 1000) -> Iterator[Author]:
+        return self.store.stream(batch_size=batch_size)
 
-    def add(self, name: str) -> None:
-        max_id = max(author.id for author in self.data)
-        self.data.append(Author(id=max_id + 1, name=name))
+    def missing(self, ids: Iterable[int]) -> set[int]:
+        return {id for id in set(ids) if id not in self.store}
+
+    def add(self, name: str) -> Author:
+        with self.id_allocator.lock:
+            new_author = Author(id=self.id_allocator.allocate(), name=name)
+            self.store.append(new_author)
+        return new_author
 
 
 class PublisherAPI:
-    data = [
-        Publisher(1, 'publisher 1'),
-        Publisher(2, 'publisher 2'),
-        Publisher(3, 'publisher 3'),
-    ]
+    def __init__(self, store: RecordStore[Publisher] | None = None) -> None:
+        if store is None:
+            store = MemoryStore([
+                Publisher(1, 'publisher 1'),
+                Publisher(2, 'publisher 2'),
+                Publisher(3, 'publisher 3'),
+            ])
+        self.store = store
+        self.id_allocator = IdAllocator(self.store.max_id() + 1)
 
     def read_all(self) -> list[Publisher]:
-        return self.data
+        return self.store.all()
 
     def read(self, id: int) -> Publisher | None:
-        for publisher in self.data:
-            if publisher.id == id:
-                return publisher
-        return None
+        return self.store.get(id)
+
+    def read_page(self, cursor: int | None = None, limit: int = 100) -> Page[Publisher]:
+        return self.store.page(cursor=cursor, limit=limit)
 
-    def add(self, name: str) -> None:
-        max_id = max(publisher.id for publisher in self.data)
-        self.data.append(Publisher(id=max_id + 1, name=name))
+    def stream(self, batch_size: int = 1000) -> Iterator[Publisher]:
+        return self.store.stream(batch_size=batch_size)
+
+    def missing(self, ids: Iterable[int]) -> set[int]:
+        return {id for id in set(ids) if id not in self.store}
+
+    def add(self, name: str) -> Publisher:
+        with self.id_allocator.lock:
+            new_publisher = Publisher(id=self.id_allocator.allocate(), name=name)
+            self.store.append(new_publisher)
+        return new_publisher
 
 
 class BookStoreAPIFacade:
@@ -102,6 +248,16 @@ class BookStoreAPIFacade:
         self.book_api: BookAPI = book_api or BookAPI()
         self.author_api: AuthorAPI = author_api or AuthorAPI()
         self.publisher_api: PublisherAPI = publisher_api or PublisherAPI()
+        self.listeners: list[BookStoreListener] = []
+
+    def add_listener(self, listener: BookStoreListener) -> None:
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: BookStoreListener) -> None:
+        try:
+            self.listeners.remove(listener)
+        except ValueError:
+            pass
 
     def create_book(
         self,
@@ -109,6 +265,24 @@ class BookStoreAPIFacade:
         author_id: int,
         publisher_id: int,
     ) -> Book:
+        if not self.listeners:
+            return self._create_book(title, author_id, publisher_id)
+
+        start = time.perf_counter()
+        try:
+            new_book = self._create_book(title, author_id, publisher_id)
+        except ValueError as e:
+            elapsed = time.perf_counter() - start
+            for listener in self.listeners:
+                listener.create_failed(e, elapsed)
+            raise
+
+        elapsed = time.perf_counter() - start
+        for listener in self.listeners:
+            listener.book_created(new_book, elapsed)
+        return new_book
+
+    def _create_book(self, title: str, author_id: int, publisher_id: int) -> Book:
         author = self.author_api.read(id=author_id)
         if author is None:
             raise ValueError(f'Author not found with id: {author_id}')
@@ -117,20 +291,76 @@ class BookStoreAPIFacade:
         if publisher is None:
             raise ValueError(f'Publisher not found with id: {publisher_id}')
 
-        new_book = self.book_api.add(
+        return self.book_api.add(
             title=title,
             authod_id=author_id,
             publisher_id=publisher_id,
         )
-        print(f'Add new book: {new_book}')
-        return new_book
+
+    def create_books(self, rows: Iterable[BookRow]) -> CreateBooksResult:
+        if not self.listeners:
+            return self._create_books(rows)
+
+        start = time.perf_counter()
+        result = self._create_books(rows)
+        elapsed = time.perf_counter() - start
+        for listener in self.listeners:
+            listener.books_created(result, elapsed)
+        return result
+
+    def _create_books(self, rows: Iterable[BookRow]) -> CreateBooksResult:
+        rows = list(rows)
+        missing_authors = self.author_api.missing(row.author_id for row in rows)
+        missing_publishers = self.publisher_api.missing(row.publisher_id for row in rows)
+
+        result = CreateBooksResult()
+        valid_rows: list[BookRow] = []
+        for i, row in enumerate(rows):
+            if row.author_id in missing_authors:
+                result.errors[i] = f'Author not found with id: {row.author_id}'
+            elif row.publisher_id in missing_publishers:
+                result.errors[i] = f'Publisher not found with id: {row.publisher_id}'
+            else:
+                valid_rows.append(row)
+
+        if valid_rows:
+            result.books = self.book_api.add_many(valid_rows)
+        return result
+
+    def list_books(self, cursor: int | None = None, limit: int = 100) -> Page[Book]:
+        return self.book_api.read_page(cursor=cursor, limit=limit)
+
+    def stream_books(self, batch_size: int = 1000) -> Iterator[Book]:
+        return self.book_api.stream(batch_size=batch_size)
+
+    def get_books_by_author(self, author_id: int) -> list[BookDetail]:
+        return self._join(self.book_api.read_by_author(author_id))
+
+    def get_books_by_publisher(self, publisher_id: int) -> list[BookDetail]:
+        return self._join(self.book_api.read_by_publisher(publisher_id))
+
+    def _join(self, books: list[Book]) -> list[BookDetail]:
+        details: list[BookDetail] = []
+        for book in books:
+            author = self.author_api.read(id=book.author_id)
+            publisher = self.publisher_api.read(id=book.publisher_id)
+            if author is not None and publisher is not None:
+                details.append(BookDetail(book=book, author=author, publisher=publisher))
+        return details
 
 
 def main() -> None:
     book_store_facade = BookStoreAPIFacade()
+    log_listener = LogListener()
+    metrics_listener = MetricsListener()
+    book_store_facade.add_listener(log_listener)
+    book_store_facade.add_listener(metrics_listener)
 
-    books = book_store_facade.book_api.read_all()
-    print('books:', books)
+    page = book_store_facade.list_books(limit=2)
+    print('books:', page.items)
+    while page.next_cursor is not None:
+        page = book_store_facade.list_books(cursor=page.next_cursor, limit=2)
+        print('books:', page.items)
 
     book_store_facade.create_book(
         title='new book',
@@ -144,6 +374,41 @@ def main() -> None:
     #     publisher_id=1,
     # )
 
+    result = book_store_facade.create_books([
+        BookRow(title='bulk book 1', author_id=1, publisher_id=2),
+        BookRow(title='bulk book 2', author_id=5, publisher_id=1),
+        BookRow(title='bulk book 3', author_id=3, publisher_id=3),
+    ])
+    log_listener.close()
+    print('created:', result.books)
+    print('errors:', result.errors)
+    print('metrics:', metrics_listener.snapshot())
+
+    for detail in book_store_facade.get_books_by_author(author_id=1):
+        print(f'{detail.book.title} by {detail.author.name} ({detail.publisher.name})')
+
+    print('-' * 30)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory)
+        for run in range(2):
+            with (
+                FileStore(path / 'books', Book, ('id', 'title', 'author_id', 'publisher_id')) as book_store,
+                FileStore(path / 'authors', Author, ('id', 'name')) as author_store,
+                FileStore(path / 'publishers', Publisher, ('id', 'name')) as publisher_store,
+            ):
+                persistent_facade = BookStoreAPIFacade(
+                    book_api=BookAPI(book_store),
+                    author_api=AuthorAPI(author_store),
+                    publisher_api=PublisherAPI(publisher_store),
+                )
+                if run == 0:
+                    persistent_facade.author_api.add('persistent author')
+                    persistent_facade.publisher_api.add('persistent publisher')
+
+                persistent_facade.create_book(title=f'persistent book {run}', author_id=1, publisher_id=1)
+                print('persistent books:', list(persistent_facade.stream_books()))
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from .main import Author, AuthorAPI, Book, BookAPI, Publisher, PublisherAPI
+
+
+class AsyncBookAPI:
+    def __init__(self, api: BookAPI | None = None, latency: float = 0.0) -> None:
+        self.api = api or BookAPI()
+        self.latency = latency
+
+    async def read_all(self) -> list[Book]:
+        await asyncio.sleep(self.latency)
+        return self.api.read_all()
+
+    async def read(self, id: int) -> Book | None:
+        await asyncio.sleep(self.latency)
+        return self.api.read(id)
+
+    async def add(self, title: str, authod_id: int, publisher_id: int) -> Book:
+        await asyncio.sleep(self.latency)
+        return self.api.add(title=title, authod_id=authod_id, publisher_id=publisher_id)
+
+
+class AsyncAuthorAPI:
+    def __init__(self, api: AuthorAPI | None = None, latency: float = 0.0) -> None:
+        self.api = api or AuthorAPI()
+        self.latency = latency
+
+    async def read_all(self) -> list[Author]:
+        await asyncio.sleep(self.latency)
+        return self.api.read_all()
+
+    async def read(self, id: int) -> Author | None:
+        await asyncio.sleep(self.latency)
+        return self.api.read(id)
+
+    async def add(self, name: str) -> Author:
+        await asyncio.sleep(self.latency)
+        return self.api.add(name=name)
+
+
+class AsyncPublisherAPI:
+    def __init__(self, api: PublisherAPI | None = None, latency: float = 0.0) -> None:
+        self.api = api or PublisherAPI()
+        self.latency = latency
+
+    async def read_all(self) -> list[Publisher]:
+        await asyncio.sleep(self.latency)
+        return self.api.read_all()
+
+    async def read(self, id: int) -> Publisher | None:
+        await asyncio.sleep(self.latency)
+        return self.api.read(id)
+
+    async def add(self, name: str) -> Publisher:
+        await asyncio.sleep(self.latency)
+        return self.api.add(name=name)
+
+
+class AsyncBookStoreAPIFacade:
+    def __init__(
+        self,
+        book_api: AsyncBookAPI | None = None,
+        author_api: AsyncAuthorAPI | None = None,
+        publisher_api: AsyncPublisherAPI | None = None,
+    ) -> None:
+        self.book_api: AsyncBookAPI = book_api or AsyncBookAPI()
+        self.author_api: AsyncAuthorAPI = author_api or AsyncAuthorAPI()
+        self.publisher_api: AsyncPublisherAPI = publisher_api or AsyncPublisherAPI()
+
+    async def create_book(
+        self,
+        title: str,
+        author_id: int,
+        publisher_id: int,
+    ) -> Book:
+        author, publisher = await asyncio.gather(
+            self.author_api.read(id=author_id),
+            self.publisher_api.read(id=publisher_id),
+        )
+        if author is None:
+            raise ValueError(f'Author not found with id: {author_id}')
+
+        if publisher is None:
+            raise ValueError(f'Publisher not found with id: {publisher_id}')
+
+        return await self.book_api.add(
+            title=title,
+            authod_id=author_id,
+            publisher_id=publisher_id,
+        )
+
+
+async def main() -> None:
+    latency = 0.05
+    book_store_facade = AsyncBookStoreAPIFacade(
+        book_api=AsyncBookAPI(latency=latency),
+        author_api=AsyncAuthorAPI(latency=latency),
+        publisher_api=AsyncPublisherAPI(latency=latency),
+    )
+
+    start = time.perf_counter()
+    book = await book_store_facade.create_book(title='new book', author_id=1, publisher_id=1)
+    print(f'Add new book: {book} in {time.perf_counter() - start:.3f}s')
+
+    n = 1_000
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(book_store_facade.create_book(title=f'book {i}', author_id=i % 5 + 1, publisher_id=1) for i in range(n)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    created = [result for result in results if isinstance(result, Book)]
+    errors = [result for result in results if isinstance(result, ValueError)]
+    print(f'{n} concurrent create_book calls: {len(created)} created, {len(errors)} rejected in {elapsed:.3f}s')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
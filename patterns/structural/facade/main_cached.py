@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from .main import Author, AuthorAPI, BookStoreAPIFacade, Publisher, PublisherAPI
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from .storage import Page
+
+
+class LRUCache[K, V]:
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = Lock()
+        # keys with a load in flight: loads running and how often the key was invalidated meanwhile
+        self._loads: dict[K, int] = {}
+        self._generations: dict[K, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_load(self, key: K, loader: Callable[[K], V]) -> V:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            self._loads[key] = self._loads.get(key, 0) + 1
+            generation = self._generations.setdefault(key, 0)
+
+        try:
+            value = loader(key)
+        except BaseException:
+            with self._lock:
+                self._end_load(key, generation)
+            raise
+
+        with self._lock:
+            # a value loaded before an invalidate may be stale, so it is returned but not cached
+            if self._end_load(key, generation):
+                expires_at = now + self.ttl if self.ttl is not None else float('inf')
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def _end_load(self, key: K, generation: int) -> bool:
+        current = self._generations[key]
+        self._loads[key] -= 1
+        if not self._loads[key]:
+            del self._loads[key]
+            del self._generations[key]
+        return current == generation
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            if key in self._generations:
+                self._generations[key] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for key in self._generations:
+                self._generations[key] += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._entries),
+        }
+
+
+class CachedAuthorAPI(AuthorAPI):
+    def __init__(self, api: AuthorAPI | None = None, maxsize: int = 1024, ttl: float | None = None) -> None:
+        self.api = api or AuthorAPI()
+        super().__init__(self.api.store)
+        self.id_allocator = self.api.id_allocator
+        self.cache: LRUCache[int, Author | None] = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def read_all(self) -> list[Author]:
+        return self.api.read_all()
+
+    def read_page(self, cursor: int | None = None, limit: int = 100) -> Page[Author]:
+        return self.api.read_page(cursor=cursor, limit=limit)
+
+    def stream(self, batch_size: int = 1000) -> Iterator[Author]:
+        return self.api.stream(batch_size=batch_size)
+
+    def read(self, id: int) -> Author | None:
+        return self.cache.get_or_load(id, self.api.read)
+
+    def missing(self, ids: Iterable[int]) -> set[int]:
+        return {id for id in set(ids) if self.read(id) is None}
+
+    def add(self, name: str) -> Author:
+        new_author = self.api.add(name=name)
+        self.cache.invalidate(new_author.id)
+        return new_author
+
+
+class CachedPublisherAPI(PublisherAPI):
+    def __init__(self, api: PublisherAPI | None = None, maxsize: int = 1024, ttl: float | None = None) -> None:
+        self.api = api or PublisherAPI()
+        super().__init__(self.api.store)
+        self.id_allocator = self.api.id_allocator
+        self.cache: LRUCache[int, Publisher | None] = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def read_all(self) -> list[Publisher]:
+        return self.api.read_all()
+
+    def read_page(self, cursor: int | None = None, limit: int = 100) -> Page[Publisher]:
+        return self.api.read_page(cursor=cursor, limit=limit)
+
+    def stream(self, batch_size: int = 1000) -> Iterator[Publisher]:
+        return self.api.stream(batch_size=batch_size)
+
+    def read(self, id: int) -> Publisher | None:
+        return self.cache.get_or_load(id, self.api.read)
+
+    def missing(self, ids: Iterable[int]) -> set[int]:
+        return {id for id in set(ids) if self.read(id) is None}
+
+    def add(self, name: str) -> Publisher:
+        new_publisher = self.api.add(name=name)
+        self.cache.invalidate(new_publisher.id)
+        return new_publisher
+
+
+def main() -> None:
+    author_api = CachedAuthorAPI(maxsize=2, ttl=60)
+    publisher_api = CachedPublisherAPI(maxsize=2, ttl=60)
+    book_store_facade = BookStoreAPIFacade(author_api=author_api, publisher_api=publisher_api)
+
+    for i in range(6):
+        book_store_facade.create_book(title=f'book {i}', author_id=i % 3 + 1, publisher_id=1)
+
+    # the miss for id 4 is cached, then invalidated once the author exists
+    print('author 4:', author_api.read(4))
+    author_api.add('author 4')
+    print('author 4:', author_api.read(4))
+
+    print('author cache:', author_api.cache.stats())
+    print('publisher cache:', publisher_api.cache.stats())
+
+
+if __name__ == '__main__':
+    main()
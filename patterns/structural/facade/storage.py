@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import bisect
+import dataclasses
+import itertools
+import json
+import mmap
+import os
+import struct
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Protocol, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from types import TracebackType
+
+
+class Record(Protocol):
+    @property
+    def id(self) -> int: ...
+
+
+@dataclasses.dataclass
+class Page[T]:
+    items: list[T]
+    next_cursor: int | None
+
+
+class RecordStore[T: Record](ABC):
+    @abstractmethod
+    def get(self, id: int) -> T | None: ...
+
+    @abstractmethod
+    def scan(self, after_id: int = 0, limit: int = 100) -> list[T]: ...
+
+    @abstractmethod
+    def __contains__(self, id: int) -> bool: ...
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[T]: ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def append(self, record: T) -> None: ...
+
+    @abstractmethod
+    def max_id(self) -> int: ...
+
+    def all(self) -> list[T]:
+        return list(self)
+
+    def page(self, cursor: int | None = None, limit: int = 100) -> Page[T]:
+        items = self.scan(after_id=cursor or 0, limit=limit)
+        next_cursor = items[-1].id if len(items) == limit else None
+        return Page(items=items, next_cursor=next_cursor)
+
+    def stream(self, batch_size: int = 1000) -> Iterator[T]:
+        after_id = 0
+        while batch := self.scan(after_id=after_id, limit=batch_size):
+            yield from batch
+            after_id = batch[-1].id
+
+    def extend(self, records: Iterable[T]) -> None:
+        for record in records:
+            self.append(record)
+
+
+class MemoryStore[T: Record](RecordStore[T]):
+    def __init__(self, records: Iterable[T] = ()) -> None:
+        self.data: list[T] = list(records)
+        self.index: dict[int, T] = {record.id: record for record in self.data}
+
+    def get(self, id: int) -> T | None:
+        return self.index.get(id)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self.index
+
+    def scan(self, after_id: int = 0, limit: int = 100) -> list[T]:
+        start = bisect.bisect_right(self.data, after_id, key=lambda record: record.id)
+        return self.data[start : start + limit]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def all(self) -> list[T]:
+        return self.data
+
+    def append(self, record: T) -> None:
+        self.data.append(record)
+        self.index[record.id] = record
+
+    def extend(self, records: Iterable[T]) -> None:
+        records = list(records)
+        self.data.extend(records)
+        self.index.update((record.id, record) for record in records)
+
+    def max_id(self) -> int:
+        return max(self.index, default=0)
+
+
+# Append-only JSON log plus a memory-mapped index of fixed-width (id, offset, length) entries.
+# Ids are appended in increasing order, so a lookup binary searches the mapped index and decodes
+# a single record from the log; nothing is loaded when the store is opened. Both files are flushed
+# on every append, and opening the store repairs whatever a crash left between the two.
+class FileStore[T: Record](RecordStore[T]):
+    entry = struct.Struct('<qQI')
+    remap_threshold = 1024
+
+    def __init__(self, path: str | os.PathLike[str], factory: Callable[..., T], fields: tuple[str, ...]) -> None:
+        self.factory = factory
+        self.fields = fields
+        self._lock = Lock()
+        self._log = open(f'{os.fspath(path)}.log', 'a+b')  # noqa: SIM115
+        self._idx = open(f'{os.fspath(path)}.idx', 'a+b')  # noqa: SIM115
+        self._map: mmap.mmap | None = None
+        self._mapped = 0
+        self._pending: dict[int, tuple[int, int]] = {}
+        self._last_id = 0
+        self._recover()
+        self._remap()
+        if self._mapped:
+            self._last_id = self._entry_at(self._mapped - 1)[0]
+
+    def _recover(self) -> None:
+        # drop a torn index entry and any entries past the end of the log, then cut a torn line off
+        # the log and index the lines written after the last entry
+        log_size = os.fstat(self._log.fileno()).st_size
+        count = os.fstat(self._idx.fileno()).st_size // self.entry.size
+        end = 0
+        while count:
+            _, offset, length = self.entry.unpack(
+                os.pread(self._idx.fileno(), self.entry.size, (count - 1) * self.entry.size)
+            )
+            if offset + length <= log_size:
+                end = offset + length
+                break
+            count -= 1
+        self._idx.truncate(count * self.entry.size)
+
+        tail = os.pread(self._log.fileno(), log_size - end, end)
+        tail = tail[: tail.rfind(b'\n') + 1]
+        self._log.truncate(end + len(tail))
+        for line in tail.splitlines(keepends=True):
+            values: list[Any] = json.loads(line)
+            self._idx.write(self.entry.pack(self.factory(*values).id, end, len(line)))
+            end += len(line)
+        self._idx.flush()
+
+    def _remap(self) -> None:
+        self._idx.flush()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        size = os.fstat(self._idx.fileno()).st_size
+        if size:
+            self._map = mmap.mmap(self._idx.fileno(), size, access=mmap.ACCESS_READ)
+        self._mapped = size // self.entry.size
+        self._pending.clear()
+
+    def _entry_at(self, position: int) -> tuple[int, int, int]:
+        assert self._map is not None
+        return self.entry.unpack_from(self._map, position * self.entry.size)
+
+    def _locate(self, id: int) -> tuple[int, int] | None:
+        if id in self._pending:
+            return self._pending[id]
+
+        low, high = 0, self._mapped - 1
+        while low <= high:
+            mid = (low + high) // 2
+            entry_id, offset, length = self._entry_at(mid)
+            if entry_id == id:
+                return offset, length
+            if entry_id < id:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return None
+
+    def _locations_after(self, after_id: int, limit: int) -> list[tuple[int, int]]:
+        low, high = 0, self._mapped
+        while low < high:
+            mid = (low + high) // 2
+            if self._entry_at(mid)[0] <= after_id:
+                low = mid + 1
+            else:
+                high = mid
+
+        locations = [self._entry_at(position)[1:] for position in range(low, min(low + limit, self._mapped))]
+        if len(locations) < limit:
+            pending = (location for id, location in self._pending.items() if id > after_id)
+            locations.extend(itertools.islice(pending, limit - len(locations)))
+        return locations
+
+    def _decode(self, offset: int, length: int) -> T:
+        values: list[Any] = json.loads(os.pread(self._log.fileno(), length, offset))
+        return self.factory(*values)
+
+    def get(self, id: int) -> T | None:
+        with self._lock:
+            location = self._locate(id)
+        if location is None:
+            return None
+        return self._decode(*location)
+
+    def __contains__(self, id: int) -> bool:
+        with self._lock:
+            return self._locate(id) is not None
+
+    def scan(self, after_id: int = 0, limit: int = 100) -> list[T]:
+        with self._lock:
+            locations = self._locations_after(after_id, limit)
+        return [self._decode(offset, length) for offset, length in locations]
+
+    def __iter__(self) -> Iterator[T]:
+        return self.stream()
+
+    def __len__(self) -> int:
+        return self._mapped + len(self._pending)
+
+    def append(self, record: T) -> None:
+        line = json.dumps([getattr(record, field) for field in self.fields]).encode() + b'\n'
+        with self._lock:
+            if record.id <= self._last_id:
+                raise ValueError(f'Record ids must be increasing, got {record.id} after {self._last_id}')
+            offset = self._log.tell()
+            self._log.write(line)
+            self._log.flush()
+            self._idx.write(self.entry.pack(record.id, offset, len(line)))
+            self._idx.flush()
+            self._pending[record.id] = (offset, len(line))
+            self._last_id = record.id
+            if len(self._pending) >= self.remap_threshold:
+                self._remap()
+
+    def max_id(self) -> int:
+        return self._last_id
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._idx.close()
+            self._log.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()